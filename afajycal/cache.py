@@ -0,0 +1,416 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from afajycal.config import Config
+
+
+class DownloadCache:
+    """ダウンロードしたファイルのキャッシュ
+
+    ダウンロードしたファイルの内容とETag・Last-Modifiedヘッダ、取得日時を
+    ローカルディスクに保存し、条件付きリクエストに利用できるようにする。
+
+    Attributes:
+        cache_dir (str): キャッシュファイルを保存するディレクトリのパス
+
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir (str): キャッシュファイルを保存するディレクトリのパス
+
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.__cache_dir = cache_dir
+
+    @property
+    def cache_dir(self) -> str:
+        return self.__cache_dir
+
+    def _get_paths(self, url: str) -> tuple:
+        """URLに対応するキャッシュファイルのパスを返す。
+
+        Args:
+            url (str): ダウンロード元のURL
+
+        Returns:
+            paths (tuple of str): 本文ファイルとメタデータファイルのパス
+
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.__cache_dir, key)
+        return (base + ".body", base + ".json")
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        """書き込み途中のファイルが読まれないよう、一時ファイル経由で保存する。
+
+        Args:
+            path (str): 保存先のパス
+            data (bytes): 保存するデータ
+
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def _read_meta(self, url: str) -> Optional[dict]:
+        """キャッシュのメタデータを読み込む。
+
+        Args:
+            url (str): ダウンロード元のURL
+
+        Returns:
+            meta (dict): メタデータの辞書。キャッシュがなければNone。
+
+        """
+        body_path, meta_path = self._get_paths(url)
+        if not os.path.exists(body_path):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(
+        self, url: str, etag: Optional[str], last_modified: Optional[str]
+    ) -> None:
+        """取得日時を現在時刻としてメタデータを保存する。
+
+        Args:
+            url (str): ダウンロード元のURL
+            etag (str): ETagヘッダの値
+            last_modified (str): Last-Modifiedヘッダの値
+
+        """
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": datetime.now(Config.JST).isoformat(),
+        }
+        self._write_file(self._get_paths(url)[1], json.dumps(meta).encode("utf-8"))
+
+    def get(self, url: str) -> Optional[dict]:
+        """キャッシュされているデータを返す。
+
+        Args:
+            url (str): ダウンロード元のURL
+
+        Returns:
+            entry (dict): 本文(content)、ETag(etag)、Last-Modified(last_modified)、
+                取得日時(fetched_at)を格納した辞書。キャッシュがなければNone。
+
+        """
+        entry = self._read_meta(url)
+        if entry is None:
+            return None
+        try:
+            with open(self._get_paths(url)[0], "rb") as f:
+                entry["content"] = f.read()
+        except OSError:
+            return None
+        return entry
+
+    def get_request_headers(self, url: str) -> dict:
+        """条件付きリクエスト用のHTTPヘッダを返す。
+
+        Args:
+            url (str): ダウンロード元のURL
+
+        Returns:
+            headers (dict): If-None-Match、If-Modified-Sinceヘッダの辞書
+
+        """
+        entry = self._read_meta(url)
+        if entry is None:
+            return dict()
+        headers = dict()
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def save(
+        self,
+        url: str,
+        content: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """ダウンロードしたデータをキャッシュに保存する。
+
+        Args:
+            url (str): ダウンロード元のURL
+            content (bytes): ダウンロードしたデータ
+            etag (str, optional): ETagヘッダの値
+            last_modified (str, optional): Last-Modifiedヘッダの値
+
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self._write_file(self._get_paths(url)[0], content)
+        self._write_meta(url, etag, last_modified)
+
+    def touch(self, url: str) -> None:
+        """サーバ側で更新されていなかったときに取得日時だけを更新する。
+
+        Args:
+            url (str): ダウンロード元のURL
+
+        """
+        meta = self._read_meta(url)
+        if meta is None:
+            return
+        self._write_meta(url, meta.get("etag"), meta.get("last_modified"))
+
+
+class QueryCache:
+    """クエリ結果のキャッシュ
+
+    件数の上限を超えた場合は最も古く参照された結果から削除し(LRU)、
+    有効期限(TTL)を過ぎた結果は使用しない。複数のスレッドから利用できる。
+
+    Attributes:
+        maxsize (int): 保持する結果の最大件数
+        ttl (float): 結果の有効期限（秒）
+        stats (dict): ヒット数(hits)、ミス数(misses)、保持件数(size)の辞書
+        version (int): 更新通知で受け取ったデータのバージョン。不明な場合はNone。
+
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        """
+        Args:
+            maxsize (int, optional): 保持する結果の最大件数。デフォルトは256。
+            ttl (float, optional): 結果の有効期限（秒）。デフォルトは300。
+
+        """
+        self.__maxsize = maxsize
+        self.__ttl = ttl
+        self.__items = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__version = None
+
+    @property
+    def maxsize(self) -> int:
+        return self.__maxsize
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @property
+    def version(self) -> Optional[int]:
+        return self.__version
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "size": len(self.__items),
+            }
+
+    def get_or_load(self, key, loader):
+        """キャッシュされている結果を返す。なければ取得してキャッシュする。
+
+        Args:
+            key (tuple): キャッシュのキー。データのバージョンを含める。
+            loader (callable): 結果を取得する関数
+
+        Returns:
+            value: キャッシュされていた結果またはloaderの戻り値
+
+        """
+        now = time.monotonic()
+        with self.__lock:
+            item = self.__items.get(key)
+            if item is not None and now - item[0] < self.__ttl:
+                self.__items.move_to_end(key)
+                self.__hits += 1
+                return item[1]
+            self.__misses += 1
+        # 取得中はロックを解放し、他のスレッドの参照を妨げないようにする。
+        value = loader()
+        with self.__lock:
+            self.__items[key] = (now, value)
+            self.__items.move_to_end(key)
+            while len(self.__items) > self.__maxsize:
+                self.__items.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """キャッシュした結果を全て削除する。"""
+        with self.__lock:
+            self.__items.clear()
+
+    def set_version(self, version: Optional[int]) -> None:
+        """データのバージョンを設定し、キャッシュした結果を全て削除する。
+
+        Args:
+            version (int): 最新のデータのバージョン。更新通知を受け取れなくなった
+                場合はNoneを設定し、データベースからバージョンを取得させる。
+
+        """
+        with self.__lock:
+            self.__version = version
+            self.__items.clear()
+
+
+class PageCache:
+    """描画済みのWebページのキャッシュ
+
+    メモリ上のQueryCacheに加え、ディレクトリが指定された場合はローカルディスクにも
+    保存し、同じサーバの他のワーカープロセスと共有する。ディスク上のファイルは
+    データのバージョンごとのディレクトリに保存する。
+
+    Attributes:
+        cache_dir (str): ディスクキャッシュのディレクトリ。使用しない場合はNone。
+        version (int): 更新通知で受け取ったデータのバージョン。不明な場合はNone。
+        stats (dict): メモリのヒット数(hits)、ミス数(misses)、保持件数(size)と
+            ディスクのヒット数(disk_hits)の辞書
+
+    """
+
+    def __init__(
+        self, maxsize: int = 128, ttl: float = 300, cache_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            maxsize (int, optional): メモリに保持するページの最大件数。
+            ttl (float, optional): メモリに保持したページの有効期限（秒）。
+            cache_dir (str, optional): ディスクキャッシュのディレクトリ。
+
+        """
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.__cache_dir = cache_dir
+        self.__memory = QueryCache(maxsize, ttl)
+        self.__lock = threading.Lock()
+        self.__disk_hits = 0
+
+    @property
+    def cache_dir(self) -> Optional[str]:
+        return self.__cache_dir
+
+    @property
+    def version(self) -> Optional[int]:
+        return self.__memory.version
+
+    @property
+    def stats(self) -> dict:
+        stats = self.__memory.stats
+        with self.__lock:
+            stats["disk_hits"] = self.__disk_hits
+        return stats
+
+    def _get_path(self, key: tuple, version: int) -> str:
+        """ディスクキャッシュのファイルのパスを返す。
+
+        Args:
+            key (tuple): ページを表示する条件
+            version (int): データのバージョン
+
+        Returns:
+            path (str): ファイルのパス
+
+        """
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest() + ".html"
+        return os.path.join(self.__cache_dir, str(version), name)
+
+    def _read_page(self, key: tuple, version: int) -> Optional[str]:
+        """ディスクキャッシュからページを読み込む。
+
+        Args:
+            key (tuple): ページを表示する条件
+            version (int): データのバージョン
+
+        Returns:
+            page (str): 描画済みのページ。キャッシュがなければNone。
+
+        """
+        if self.__cache_dir is None:
+            return None
+        try:
+            with open(self._get_path(key, version), encoding="utf-8") as f:
+                page = f.read()
+        except OSError:
+            return None
+        with self.__lock:
+            self.__disk_hits += 1
+        return page
+
+    def _write_page(self, key: tuple, version: int, page: str) -> None:
+        """ディスクキャッシュにページを保存する。
+
+        Args:
+            key (tuple): ページを表示する条件
+            version (int): データのバージョン
+            page (str): 描画済みのページ
+
+        """
+        if self.__cache_dir is None:
+            return
+        path = self._get_path(key, version)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            DownloadCache._write_file(path, page.encode("utf-8"))
+        except OSError:
+            # ディスクに保存できなくてもメモリのキャッシュは使用できる。
+            pass
+
+    def get_or_load(self, key: tuple, version: int, loader) -> str:
+        """キャッシュされているページを返す。なければ描画してキャッシュする。
+
+        Args:
+            key (tuple): 正規化したページを表示する条件
+            version (int): データのバージョン
+            loader (callable): ページを描画する関数
+
+        Returns:
+            page (str): 描画済みのページ
+
+        """
+
+        def load():
+            page = self._read_page(key, version)
+            if page is None:
+                page = loader()
+                self._write_page(key, version, page)
+            return page
+
+        return self.__memory.get_or_load((key, version), load)
+
+    def set_version(self, version: Optional[int]) -> None:
+        """データのバージョンを設定し、古いページを削除する。
+
+        Args:
+            version (int): 最新のデータのバージョン。不明な場合はNone。
+
+        """
+        self.__memory.set_version(version)
+        if self.__cache_dir is None or version is None:
+            return
+        for name in os.listdir(self.__cache_dir):
+            if name != str(version):
+                shutil.rmtree(os.path.join(self.__cache_dir, name), ignore_errors=True)
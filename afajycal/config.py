@@ -4,5 +4,33 @@ from datetime import timedelta, timezone
 
 class Config:
     THIS_YEAR = 2020
+    # 取り込む試合スケジュールのURLと年度のJSON。Webアプリケーションが誤った値で
+    # 起動できなくならないよう、取り込み処理で読み込む。
+    SOURCES = os.environ.get("AFAJYCAL_SOURCES")
+    DEFAULT_SOURCES = [
+        {"url": "http://afa11.com/asahijy/reiwa2/nittei2020.html", "year": THIS_YEAR}
+    ]
+    FETCH_MAX_WORKERS = int(os.environ.get("AFAJYCAL_FETCH_MAX_WORKERS", 8))
+    FETCH_PER_HOST = int(os.environ.get("AFAJYCAL_FETCH_PER_HOST", 2))
+    FETCH_TIMEOUT = float(os.environ.get("AFAJYCAL_FETCH_TIMEOUT", 30))
+    FETCH_RETRIES = int(os.environ.get("AFAJYCAL_FETCH_RETRIES", 3))
+    FETCH_BACKOFF = float(os.environ.get("AFAJYCAL_FETCH_BACKOFF", 1))
     JST = timezone(timedelta(hours=+9), "JST")
     DATABASE_URL = os.environ.get("AFAJYCAL_DB_URL")
+    CACHE_DIR = os.environ.get("AFAJYCAL_CACHE_DIR")
+    DB_POOL_MIN = int(os.environ.get("AFAJYCAL_DB_POOL_MIN", 1))
+    DB_POOL_MAX = int(os.environ.get("AFAJYCAL_DB_POOL_MAX", 10))
+    DB_POOL_HEALTH_CHECK_INTERVAL = int(
+        os.environ.get("AFAJYCAL_DB_POOL_HEALTH_CHECK_INTERVAL", 30)
+    )
+    DB_POOL_TIMEOUT = float(os.environ.get("AFAJYCAL_DB_POOL_TIMEOUT", 10))
+    QUERY_CACHE_SIZE = int(os.environ.get("AFAJYCAL_QUERY_CACHE_SIZE", 256))
+    QUERY_CACHE_TTL = int(os.environ.get("AFAJYCAL_QUERY_CACHE_TTL", 300))
+    PAGE_CACHE_SIZE = int(os.environ.get("AFAJYCAL_PAGE_CACHE_SIZE", 128))
+    PAGE_CACHE_DIR = os.environ.get("AFAJYCAL_PAGE_CACHE_DIR")
+    STATIC_DIR = os.environ.get("AFAJYCAL_STATIC_DIR")
+    CALENDAR_DIR = os.environ.get("AFAJYCAL_CALENDAR_DIR")
+    API_PAGE_SIZE = 100
+    API_MAX_PAGE_SIZE = 1000
+    NOTIFY_CHANNEL = "afajycal_schedules"
+    LISTEN_CHANGES = os.environ.get("AFAJYCAL_LISTEN_CHANGES", "1") == "1"
@@ -1,5 +1,12 @@
+import os
+import threading
+import time
+import weakref
+
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from psycopg2.extras import DictCursor
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 
 from afajycal.config import Config
 from afajycal.errors import DatabaseError
@@ -13,21 +20,38 @@ class DB:
 
     """
 
-    def __init__(self):
-        try:
-            self.__conn = psycopg2.connect(Config.DATABASE_URL)
-        except (psycopg2.DatabaseError, psycopg2.OperationalError) as e:
-            raise DatabaseError(e.args[0])
+    def __init__(self, conn=None, pool=None):
+        """
+        Args:
+            conn (:obj:`psycopg2.extensions.connection`, optional): 接続済みの
+                コネクション。省略した場合は新たに接続する。
+            pool (:obj:`DBPool`, optional): コネクションの取得元のプール。
+                指定した場合、closeでコネクションをプールへ返却する。
 
-    def cursor(self) -> DictCursor:
+        """
+        if conn is None:
+            try:
+                conn = psycopg2.connect(Config.DATABASE_URL)
+            except (psycopg2.DatabaseError, psycopg2.OperationalError) as e:
+                raise DatabaseError(e.args[0])
+        self.__conn = conn
+        self.__pool = pool
+
+    def cursor(self, name: str = None, cursor_factory=DictCursor) -> DictCursor:
         """
         psycopg2.extras.DictCursorオブジェクトを返す。
 
+        Args:
+            name (str, optional): 名前を指定した場合はサーバサイドカーソルを返す。
+                検索結果を全て取得せず、少しずつ読み込むことができる。
+            cursor_factory (optional): カーソルのクラス。Noneを指定した場合は
+                行をタプルで返すカーソルを返す。
+
         Returns:
             cursor (:obj:`DictCursor`): psycopg2.extras.DictCursorオブジェクト
 
         """
-        return self.__conn.cursor(cursor_factory=DictCursor)
+        return self.__conn.cursor(name=name, cursor_factory=cursor_factory)
 
     def commit(self) -> None:
         """PostgreSQLデータベースにクエリをコミットする。"""
@@ -38,5 +62,192 @@ class DB:
         self.__conn.rollback()
 
     def close(self) -> None:
-        """PostgreSQLデータベースへの接続を閉じる。"""
-        self.__conn.close()
+        """PostgreSQLデータベースへの接続を閉じる。
+
+        プールから取得したコネクションの場合はプールへ返却する。
+
+        """
+        if self.__pool is None:
+            self.__conn.close()
+        else:
+            self.__pool.release(self.__conn)
+
+
+class DBPool:
+    """PostgreSQLデータベースへのコネクションをプールする。
+
+    スレッドセーフなpsycopg2.pool.ThreadedConnectionPoolをラップする。
+    gunicornのワーカーなどでプロセスがforkされた場合は、親プロセスの
+    コネクションを共有しないよう、プロセスごとにプールを作り直す。
+    全てのコネクションが使用中の場合は、返却されるまでtimeout秒待つ。
+
+    Attributes:
+        minconn (int): プールに保持するコネクションの最小数。
+        maxconn (int): プールに保持するコネクションの最大数。
+        health_check_interval (int): この秒数より長く使われていなかった
+            コネクションは、取得時に接続を確認する。
+        timeout (float): コネクションが返却されるのを待つ最大の秒数。
+
+    """
+
+    def __init__(
+        self,
+        minconn: int = Config.DB_POOL_MIN,
+        maxconn: int = Config.DB_POOL_MAX,
+        health_check_interval: int = Config.DB_POOL_HEALTH_CHECK_INTERVAL,
+        timeout: float = Config.DB_POOL_TIMEOUT,
+    ):
+        """
+        Args:
+            minconn (int, optional): プールに保持するコネクションの最小数。
+            maxconn (int, optional): プールに保持するコネクションの最大数。
+            health_check_interval (int, optional): 接続を確認するまでの
+                未使用時間（秒）。
+            timeout (float, optional): コネクションが返却されるのを待つ最大の秒数。
+
+        """
+        self.__minconn = minconn
+        self.__maxconn = maxconn
+        self.__health_check_interval = health_check_interval
+        self.__timeout = timeout
+        self.__lock = threading.Lock()
+        self.__pool = None
+        self.__pid = None
+        # ThreadedConnectionPoolは空きがないと待たずに例外にするため、
+        # 使用中のコネクションの数をセマフォで数えて空きを待つ。
+        self.__semaphore = threading.BoundedSemaphore(maxconn)
+        # idは破棄されたコネクションのものが再利用されるため、コネクション自体をキーにする。
+        self.__released_at = weakref.WeakKeyDictionary()
+
+    @property
+    def minconn(self) -> int:
+        return self.__minconn
+
+    @property
+    def maxconn(self) -> int:
+        return self.__maxconn
+
+    @property
+    def health_check_interval(self) -> int:
+        return self.__health_check_interval
+
+    @property
+    def timeout(self) -> float:
+        return self.__timeout
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """現在のプロセスのコネクションプールを返す。
+
+        Returns:
+            pool (:obj:`ThreadedConnectionPool`): コネクションプール
+
+        """
+        with self.__lock:
+            if self.__pool is None or self.__pid != os.getpid():
+                # fork前のコネクションは親プロセスが使っているため閉じずに破棄する。
+                try:
+                    self.__pool = ThreadedConnectionPool(
+                        self.__minconn, self.__maxconn, Config.DATABASE_URL
+                    )
+                except (psycopg2.DatabaseError, psycopg2.OperationalError) as e:
+                    raise DatabaseError(e.args[0])
+                if self.__pid is not None:
+                    # fork後のプロセスでは親プロセスの使用中のコネクションを数えない。
+                    self.__semaphore = threading.BoundedSemaphore(self.__maxconn)
+                self.__pid = os.getpid()
+                self.__released_at = weakref.WeakKeyDictionary()
+            return self.__pool
+
+    def _is_healthy(self, conn) -> bool:
+        """コネクションが使用できる状態か確認する。
+
+        Args:
+            conn (:obj:`psycopg2.extensions.connection`): 確認するコネクション
+
+        Returns:
+            bool: 使用できる状態であればTrueを返す。
+
+        """
+        if conn.closed:
+            return False
+        released_at = self.__released_at.get(conn)
+        if released_at is None:
+            return True
+        if time.monotonic() - released_at < self.__health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except (psycopg2.DatabaseError, psycopg2.OperationalError):
+            return False
+
+    def connect(self) -> DB:
+        """プールからコネクションを取得する。
+
+        Returns:
+            db (:obj:`DB`): プールへ返却するDBオブジェクト
+
+        Raises:
+            DatabaseError: timeout秒待ってもコネクションを取得できなかった場合。
+
+        """
+        pool = self._get_pool()
+        semaphore = self.__semaphore
+        if not semaphore.acquire(timeout=self.__timeout):
+            raise DatabaseError("timed out waiting for a connection from the pool.")
+        try:
+            # 切断されていたコネクションは破棄して取得し直す。
+            for _ in range(self.__maxconn + 1):
+                try:
+                    conn = pool.getconn()
+                except (
+                    PoolError,
+                    psycopg2.DatabaseError,
+                    psycopg2.OperationalError,
+                ) as e:
+                    raise DatabaseError(e.args[0])
+                if self._is_healthy(conn):
+                    return DB(conn=conn, pool=self)
+                self.__released_at.pop(conn, None)
+                pool.putconn(conn, close=True)
+            raise DatabaseError("cannot get a healthy connection from the pool.")
+        except DatabaseError:
+            semaphore.release()
+            raise
+
+    def release(self, conn) -> None:
+        """コネクションをプールへ返却する。
+
+        Args:
+            conn (:obj:`psycopg2.extensions.connection`): 返却するコネクション
+
+        """
+        pool = self._get_pool()
+        try:
+            if conn.closed:
+                self.__released_at.pop(conn, None)
+                pool.putconn(conn, close=True)
+                return
+            # 読み取りだけのリクエストでもトランザクションが開始されているため終了させる。
+            if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except (psycopg2.DatabaseError, psycopg2.OperationalError):
+                    self.__released_at.pop(conn, None)
+                    pool.putconn(conn, close=True)
+                    return
+            self.__released_at[conn] = time.monotonic()
+            pool.putconn(conn)
+        finally:
+            # 空きを待っているリクエストにコネクションを渡せるようにする。
+            self.__semaphore.release()
+
+    def close(self) -> None:
+        """プールの全てのコネクションを閉じる。"""
+        with self.__lock:
+            if self.__pool is not None and self.__pid == os.getpid():
+                self.__pool.closeall()
+            self.__pool = None
+            self.__pid = None
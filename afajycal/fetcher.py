@@ -0,0 +1,280 @@
+import json
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from afajycal.cache import DownloadCache
+from afajycal.config import Config
+from afajycal.errors import HTMLDownloadError
+from afajycal.logs import AppLog
+from afajycal.scraper import (
+    DownloadedData,
+    DownloadedExcel,
+    DownloadedHTML,
+    ScrapedData,
+    ScrapedExcelData,
+    ScrapedHTMLData,
+)
+
+
+class Source:
+    """試合スケジュールの取得元
+
+    Attributes:
+        url (str): 試合スケジュールのHTMLページまたはExcelファイルのURL
+        year (int): 試合スケジュールの年度
+        kind (str): htmlまたはexcel
+
+    """
+
+    def __init__(
+        self, url: str, year: Optional[int] = None, kind: Optional[str] = None
+    ):
+        """
+        Args:
+            url (str): 試合スケジュールのHTMLページまたはExcelファイルのURL
+            year (int, optional): 試合スケジュールの年度。
+                指定しない場合はConfig.THIS_YEAR。
+            kind (str, optional): htmlまたはexcel。指定しない場合は
+                URLの拡張子が.xlsxならexcel、それ以外はhtmlとする。
+
+        """
+        self.__url = url
+        self.__year = Config.THIS_YEAR if year is None else year
+        if kind is None:
+            path = urllib.parse.urlsplit(url).path
+            kind = "excel" if path.lower().endswith(".xlsx") else "html"
+        if kind not in ("html", "excel"):
+            raise ValueError("kind must be html or excel.")
+        self.__kind = kind
+
+    @property
+    def url(self) -> str:
+        return self.__url
+
+    @property
+    def year(self) -> int:
+        return self.__year
+
+    @property
+    def kind(self) -> str:
+        return self.__kind
+
+    def download(
+        self,
+        cache: Optional[DownloadCache] = None,
+        session: Optional[requests.Session] = None,
+        timeout: Optional[float] = None,
+    ) -> DownloadedData:
+        """試合スケジュールをダウンロードする。
+
+        Args:
+            cache (:obj:`DownloadCache`, optional): ダウンロードキャッシュ
+            session (:obj:`requests.Session`, optional): 共有するセッション
+            timeout (float, optional): 接続・読み込みのタイムアウト秒数
+
+        Returns:
+            downloaded_data (:obj:`DownloadedData`): ダウンロードしたデータ
+
+        """
+        if self.__kind == "excel":
+            return DownloadedExcel(self.__url, cache, session, timeout)
+        return DownloadedHTML(self.__url, cache, session, timeout)
+
+    def scrape(self, downloaded_data: DownloadedData) -> ScrapedData:
+        """ダウンロードしたデータから試合スケジュールを抽出するオブジェクトを返す。
+
+        Args:
+            downloaded_data (:obj:`DownloadedData`): ダウンロードしたデータ
+
+        Returns:
+            scraped_data (:obj:`ScrapedData`): 取得元の年度で抽出するオブジェクト
+
+        """
+        if self.__kind == "excel":
+            return ScrapedExcelData(downloaded_data, this_year=self.__year)
+        return ScrapedHTMLData(downloaded_data, this_year=self.__year)
+
+
+def load_sources(value: Optional[str] = None) -> list:
+    """AFAJYCAL_SOURCESのJSONから取得元のリストを作成する。
+
+    Args:
+        value (str, optional): 取得元のURLと年度を表すオブジェクトの配列のJSON。
+            指定しない場合はConfig.DEFAULT_SOURCES。
+
+    Returns:
+        sources (list of :obj:`Source`): 取得元のリスト
+
+    Raises:
+        ValueError: JSONとして読み込めない場合や、取得元の指定が正しくない場合。
+
+    """
+    if not value:
+        entries = Config.DEFAULT_SOURCES
+    else:
+        try:
+            entries = json.loads(value)
+        except ValueError as e:
+            raise ValueError("AFAJYCAL_SOURCES is not valid JSON: " + str(e))
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("AFAJYCAL_SOURCES must be a non-empty JSON array.")
+    sources = list()
+    for entry in entries:
+        if not isinstance(entry, dict) or "url" not in entry:
+            raise ValueError("each source in AFAJYCAL_SOURCES must have a url.")
+        try:
+            sources.append(Source(**entry))
+        except TypeError as e:
+            raise ValueError("invalid source in AFAJYCAL_SOURCES: " + str(e))
+    return sources
+
+
+class Fetcher:
+    """複数の取得元からの試合スケジュールの並行ダウンロード
+
+    スレッドプールで全ての取得元を並行してダウンロードするため、
+    かかる時間は合計ではなく、最も遅い取得元の時間に近くなる。
+    同じホストへの同時接続数を制限し、接続は1つのセッションで使い回す。
+    ダウンロードに失敗した場合は待ち時間を倍にしながら再試行する。
+
+    Attributes:
+        max_workers (int): 同時にダウンロードする最大数
+        per_host (int): 同じホストへ同時にダウンロードする最大数
+        timeout (float): 接続・読み込みのタイムアウト秒数
+        retries (int): 失敗したときに再試行する回数
+        backoff (float): 1回目の再試行までの待ち時間の秒数
+
+    """
+
+    def __init__(
+        self,
+        cache: Optional[DownloadCache] = None,
+        max_workers: int = Config.FETCH_MAX_WORKERS,
+        per_host: int = Config.FETCH_PER_HOST,
+        timeout: float = Config.FETCH_TIMEOUT,
+        retries: int = Config.FETCH_RETRIES,
+        backoff: float = Config.FETCH_BACKOFF,
+    ):
+        """
+        Args:
+            cache (:obj:`DownloadCache`, optional): ダウンロードキャッシュ
+            max_workers (int, optional): 同時にダウンロードする最大数
+            per_host (int, optional): 同じホストへ同時にダウンロードする最大数
+            timeout (float, optional): 接続・読み込みのタイムアウト秒数
+            retries (int, optional): 失敗したときに再試行する回数
+            backoff (float, optional): 1回目の再試行までの待ち時間の秒数
+
+        """
+        self.__logger = AppLog()
+        self.__cache = cache
+        self.__max_workers = max_workers
+        self.__per_host = per_host
+        self.__timeout = timeout
+        self.__retries = retries
+        self.__backoff = backoff
+        self.__session = requests.Session()
+        # 全てのスレッドが接続を使い回せるよう、接続プールをスレッド数に合わせる。
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+        self.__semaphores = dict()
+        self.__lock = threading.Lock()
+
+    @property
+    def max_workers(self) -> int:
+        return self.__max_workers
+
+    @property
+    def per_host(self) -> int:
+        return self.__per_host
+
+    @property
+    def timeout(self) -> float:
+        return self.__timeout
+
+    @property
+    def retries(self) -> int:
+        return self.__retries
+
+    @property
+    def backoff(self) -> float:
+        return self.__backoff
+
+    def _get_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """URLのホストごとの同時接続数を制限するセマフォを返す。
+
+        Args:
+            url (str): ダウンロードするURL
+
+        Returns:
+            semaphore (:obj:`threading.BoundedSemaphore`): ホストのセマフォ
+
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self.__lock:
+            if host not in self.__semaphores:
+                self.__semaphores[host] = threading.BoundedSemaphore(self.__per_host)
+            return self.__semaphores[host]
+
+    def _download(self, source: Source) -> DownloadedData:
+        """1つの取得元をダウンロードする。失敗した場合は再試行する。
+
+        Args:
+            source (:obj:`Source`): 試合スケジュールの取得元
+
+        Returns:
+            downloaded_data (:obj:`DownloadedData`): ダウンロードしたデータ
+
+        Raises:
+            HTMLDownloadError: 再試行しても失敗した場合。
+
+        """
+        semaphore = self._get_semaphore(source.url)
+        attempt = 0
+        while True:
+            try:
+                with semaphore:
+                    return source.download(self.__cache, self.__session, self.__timeout)
+            except HTMLDownloadError:
+                if attempt >= self.__retries:
+                    raise
+            # 待っている間は同じホストへの他のダウンロードを妨げない。
+            wait = self.__backoff * 2**attempt
+            attempt += 1
+            self.__logger.warning(
+                source.url
+                + "のダウンロードに失敗したため"
+                + str(wait)
+                + "秒後に再試行します。"
+            )
+            time.sleep(wait)
+
+    def fetch(self, sources: list) -> list:
+        """全ての取得元を並行してダウンロードする。
+
+        Args:
+            sources (list of :obj:`Source`): 試合スケジュールの取得元のリスト
+
+        Returns:
+            downloaded_data (list of :obj:`DownloadedData`): 取得元と同じ順の
+                ダウンロードしたデータのリスト
+
+        Raises:
+            HTMLDownloadError: いずれかの取得元のダウンロードに失敗した場合。
+
+        """
+        if not sources:
+            return list()
+        max_workers = min(self.__max_workers, len(sources))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self._download, sources))
+
+    def close(self) -> None:
+        """セッションを閉じる。"""
+        self.__session.close()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+
+
+def make_build_dir(target: str) -> str:
+    """公開するディレクトリの作業用ディレクトリを作成する。
+
+    作業用ディレクトリはtargetと同じ場所に作成し、publish_dirで
+    そのまま公開するディレクトリとして使う。
+
+    Args:
+        target (str): 公開するディレクトリのパス。
+
+    Returns:
+        build_dir (str): 作成した作業用ディレクトリのパス。
+
+    """
+    parent, name = os.path.split(os.path.abspath(target))
+    os.makedirs(parent, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=name + ".", dir=parent)
+    # mkdtempは所有者しか読めないため、Webサーバから読めるようにする。
+    os.chmod(build_dir, 0o755)
+    return build_dir
+
+
+def publish_dir(build_dir: str, target: str) -> None:
+    """作業用ディレクトリを公開する。
+
+    targetを作業用ディレクトリへのシンボリックリンクとし、一時的な名前の
+    リンクをos.replaceで置き換えて切り替える。切り替えの途中でもtargetは
+    常に前回か今回のどちらかのディレクトリを指すため、配信中のリクエストが
+    ファイルを見失うことはない。前回のディレクトリは切り替えた後に削除する。
+
+    targetがシンボリックリンクではない通常のディレクトリの場合は、
+    初回だけ名前を変えてから置き換える。
+
+    Args:
+        build_dir (str): make_build_dirで作成した作業用ディレクトリのパス。
+        target (str): 公開するディレクトリのパス。
+
+    """
+    target = os.path.abspath(target)
+    old_dir = None
+    if os.path.islink(target):
+        old_dir = os.path.realpath(target)
+    elif os.path.isdir(target):
+        old_dir = tempfile.mkdtemp(
+            prefix=os.path.basename(target) + ".", dir=os.path.dirname(target)
+        )
+        os.rmdir(old_dir)
+        os.rename(target, old_dir)
+
+    link = build_dir + ".link"
+    os.symlink(os.path.basename(build_dir), link)
+    os.replace(link, target)
+    if old_dir is not None and old_dir != os.path.realpath(build_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
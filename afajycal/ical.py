@@ -0,0 +1,243 @@
+import os
+import shutil
+import urllib.parse
+from datetime import datetime, timezone
+
+from afajycal.files import make_build_dir, publish_dir
+from afajycal.logs import AppLog
+
+PRODID = "-//afajycal//AFA Junior Youth Calendar//JA"
+
+
+def escape_text(value: str) -> str:
+    """iCalendarのテキスト値に使えない文字をエスケープする。
+
+    Args:
+        value (str): 元の文字列。
+
+    Returns:
+        escaped_value (str): エスケープした文字列。
+
+    """
+    value = value.replace("\\", "\\\\")
+    value = value.replace(";", "\\;").replace(",", "\\,")
+    return value.replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def fold_line(line: str) -> str:
+    """1行が75オクテットを超えないよう、iCalendarの形式で折り返す。
+
+    マルチバイト文字の途中では折り返さない。
+
+    Args:
+        line (str): 元の行。
+
+    Returns:
+        folded_line (str): 折り返した行。
+
+    """
+    lines = list()
+    current = ""
+    size = 0
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        # 2行目以降は先頭の空白1文字分を含めて75オクテットに収める。
+        limit = 75 if not lines else 74
+        if size + char_size > limit:
+            lines.append(current)
+            current = ""
+            size = 0
+        current += char
+        size += char_size
+    lines.append(current)
+    return "\r\n ".join(lines)
+
+
+def format_datetime(value: datetime) -> str:
+    """日時をiCalendarのUTC形式の文字列にする。
+
+    Args:
+        value (:obj:`datetime.datetime`): タイムゾーン付きの日時。
+
+    Returns:
+        formatted_value (str): YYYYMMDDTHHMMSSZ形式の文字列。
+
+    """
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def make_calendar(name: str, schedules: list, dtstamp: datetime) -> str:
+    """試合スケジュールのiCalendarデータを作成する。
+
+    Args:
+        name (str): カレンダーの名前。
+        schedules (list of :obj:`Schedule`): 試合スケジュールのリスト。
+        dtstamp (:obj:`datetime.datetime`): カレンダーの作成日時。
+
+    Returns:
+        calendar (str): iCalendar形式の文字列。
+
+    """
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:" + PRODID,
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:" + escape_text(name),
+        "X-WR-TIMEZONE:Asia/Tokyo",
+    ]
+    for schedule in sorted(
+        schedules, key=lambda x: (x.kickoff_time, str(x.serial_number))
+    ):
+        summary = (
+            schedule.category
+            + " ("
+            + schedule.home_team
+            + " vs "
+            + schedule.away_team
+            + ")"
+        )
+        lines += [
+            "BEGIN:VEVENT",
+            "UID:" + str(schedule.serial_number) + "@afajycal",
+            "DTSTAMP:" + format_datetime(dtstamp),
+            "DTSTART:" + format_datetime(schedule.kickoff_time),
+            "DTEND:" + format_datetime(schedule.end_time),
+            "SUMMARY:" + escape_text(summary),
+            "LOCATION:" + escape_text(schedule.studium),
+            "DESCRIPTION:" + escape_text("試合番号: " + schedule.match_number),
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(fold_line(line) + "\r\n" for line in lines)
+
+
+class CalendarFeeds:
+    """iCalendar形式の購読用カレンダーの生成
+
+    チームごと、カテゴリごとの試合スケジュールをiCalendar形式のファイルとして
+    ディレクトリに保存する。カレンダーアプリからの定期的な取得に
+    データベースへ問い合わせずに応答できるよう、取り込み時に生成しておく。
+
+    生成するファイルは次のとおり。チーム名・カテゴリ名はURLエンコードする。
+
+        team/{チーム名}.ics
+        category/{カテゴリ名}.ics
+
+    内容が変わらないファイルは前回のファイルをそのまま使い、
+    更新日時から作られるETagやLast-Modifiedを変えないようにする。
+
+    Attributes:
+        feed_dir (str): カレンダーを保存するディレクトリ
+
+    """
+
+    def __init__(self, feed_dir: str):
+        """
+        Args:
+            feed_dir (str): カレンダーを保存するディレクトリ
+
+        """
+        self.__feed_dir = os.path.abspath(feed_dir)
+        self.__logger = AppLog()
+
+    @property
+    def feed_dir(self) -> str:
+        return self.__feed_dir
+
+    @staticmethod
+    def get_filename(kind: str, name: str) -> str:
+        """カレンダーのファイルの相対パスを返す。
+
+        Args:
+            kind (str): teamまたはcategory。
+            name (str): チーム名・カテゴリ名。
+
+        Returns:
+            filename (str): feed_dirからの相対パス。
+
+        """
+        return kind + "/" + urllib.parse.quote(name, safe="") + ".ics"
+
+    @staticmethod
+    def _strip_dtstamp(calendar: str) -> str:
+        """内容を比較するため、作成日時の行を除く。
+
+        Args:
+            calendar (str): iCalendar形式の文字列。
+
+        Returns:
+            calendar (str): DTSTAMPの行を除いた文字列。
+
+        """
+        return "".join(
+            line
+            for line in calendar.splitlines(keepends=True)
+            if not line.startswith("DTSTAMP:")
+        )
+
+    def _write_calendar(self, filename: str, build_dir: str, calendar: str) -> None:
+        """カレンダーを保存する。前回と内容が同じ場合はファイルをコピーする。
+
+        Args:
+            filename (str): feed_dirからの相対パス。
+            build_dir (str): 作業用ディレクトリ。
+            calendar (str): iCalendar形式の文字列。
+
+        """
+        path = os.path.join(build_dir, filename)
+        old_path = os.path.join(self.__feed_dir, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(old_path, encoding="utf-8", newline="") as f:
+                old_calendar = f.read()
+        except OSError:
+            old_calendar = None
+        if old_calendar is not None and self._strip_dtstamp(
+            old_calendar
+        ) == self._strip_dtstamp(calendar):
+            shutil.copy2(old_path, path)
+            return
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(calendar)
+
+    def build(self, schedules: list) -> int:
+        """全てのチーム・カテゴリのカレンダーを生成して保存する。
+
+        Args:
+            schedules (list of :obj:`Schedule`): 全ての試合スケジュールのリスト。
+
+        Returns:
+            count (int): 保存したカレンダーの数。
+
+        """
+        teams = dict()
+        categories = dict()
+        for schedule in schedules:
+            for team_name in {schedule.home_team, schedule.away_team}:
+                teams.setdefault(team_name, list()).append(schedule)
+            categories.setdefault(schedule.category, list()).append(schedule)
+
+        dtstamp = datetime.now(timezone.utc)
+        build_dir = make_build_dir(self.__feed_dir)
+        count = 0
+        try:
+            for kind, groups in (("team", teams), ("category", categories)):
+                for name, items in groups.items():
+                    if not name:
+                        continue
+                    calendar = make_calendar(
+                        "AFA Junior Youth Calendar " + name, items, dtstamp
+                    )
+                    self._write_calendar(
+                        self.get_filename(kind, name), build_dir, calendar
+                    )
+                    count += 1
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        publish_dir(build_dir, self.__feed_dir)
+        self.__logger.info(str(count) + "件のカレンダーを生成しました。")
+        return count
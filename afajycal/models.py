@@ -1,4 +1,7 @@
+import hashlib
 import urllib.parse
+from array import array
+from collections.abc import Sequence
 from datetime import date, datetime, timedelta, timezone
 
 from afajycal.errors import ScheduleError
@@ -14,13 +17,31 @@ class Schedule:
         match_number (str): 試合番号。
         match_date (datetime.date): 試合開始日。
         kickoff_time (datetime.date): 試合開始時刻。
+        end_time (datetime.datetime): 試合終了時刻。サテライトは60分、
+            それ以外は90分の試合として計算する。
         home_team (str): ホームチーム。
         away_team (str): アウェイチーム。
         studium (str): 試合会場。
         google_calendar_link (str): 試合スケジュールをGoogleカレンダーへ追加するリンク。
+        digest (str): 試合スケジュールの内容から計算したハッシュ値。
 
     """
 
+    # 大量の試合スケジュールを読み込んでもメモリを使いすぎないよう、
+    # インスタンスごとの__dict__を作らない。
+    __slots__ = (
+        "__serial_number",
+        "__category",
+        "__match_number",
+        "__match_date",
+        "__kickoff_time",
+        "__home_team",
+        "__away_team",
+        "__studium",
+        "__end_time",
+        "__google_calendar_link",
+    )
+
     def __init__(
         self,
         serial_number: str,
@@ -31,6 +52,8 @@ class Schedule:
         home_team: str,
         away_team: str,
         studium: str,
+        end_time: datetime = None,
+        google_calendar_link: str = None,
     ):
         """
         Args:
@@ -42,7 +65,11 @@ class Schedule:
             home_team (str): ホームチーム。
             away_team (str): アウェイチーム。
             studium (str): 試合会場。
-            google_calendar_link (str): 試合スケジュールをGoogleカレンダーへ追加するリンク。
+            end_time (datetime.datetime, optional): 試合終了時刻。
+                取り込み時に計算してデータベースに保存した値を渡す。
+            google_calendar_link (str, optional): 試合スケジュールを
+                Googleカレンダーへ追加するリンク。取り込み時に作成して
+                データベースに保存した値を渡す。
 
         """
         self.__serial_number = serial_number
@@ -59,7 +86,45 @@ class Schedule:
         self.__home_team = home_team
         self.__away_team = away_team
         self.__studium = studium
-        self.__google_calendar_link = self._make_google_calendar_link()
+        self.__end_time = end_time
+        # 保存された値がなければ、最初に参照されたときに作成する。
+        self.__google_calendar_link = google_calendar_link
+
+    @classmethod
+    def _from_trusted(
+        cls,
+        serial_number: str,
+        category: str,
+        match_number: str,
+        match_date: date,
+        kickoff_time: datetime,
+        home_team: str,
+        away_team: str,
+        studium: str,
+        end_time: datetime = None,
+        google_calendar_link: str = None,
+    ):
+        """型を確認せずにScheduleオブジェクトを作成する。
+
+        データベースから読み込んだ値のように、型が正しいことが分かっている
+        場合にだけ使用する。
+
+        Returns:
+            schedule (:obj:`Schedule`): Scheduleクラスのオブジェクト。
+
+        """
+        schedule = cls.__new__(cls)
+        schedule.__serial_number = serial_number
+        schedule.__category = category
+        schedule.__match_number = match_number
+        schedule.__match_date = match_date
+        schedule.__kickoff_time = kickoff_time
+        schedule.__home_team = home_team
+        schedule.__away_team = away_team
+        schedule.__studium = studium
+        schedule.__end_time = end_time
+        schedule.__google_calendar_link = google_calendar_link
+        return schedule
 
     @property
     def serial_number(self) -> str:
@@ -81,6 +146,16 @@ class Schedule:
     def kickoff_time(self) -> datetime:
         return self.__kickoff_time
 
+    @property
+    def end_time(self) -> datetime:
+        if self.__end_time is None:
+            if self.category == "サテライト":
+                game_time = 60
+            else:
+                game_time = 90
+            self.__end_time = self.kickoff_time + timedelta(minutes=game_time)
+        return self.__end_time
+
     @property
     def home_team(self) -> str:
         return self.__home_team
@@ -95,8 +170,24 @@ class Schedule:
 
     @property
     def google_calendar_link(self) -> str:
+        if self.__google_calendar_link is None:
+            self.__google_calendar_link = self._make_google_calendar_link()
         return self.__google_calendar_link
 
+    @property
+    def digest(self) -> str:
+        values = [
+            str(self.serial_number),
+            self.category,
+            self.match_number,
+            self.match_date.isoformat(),
+            self.kickoff_time.isoformat(),
+            self.home_team,
+            self.away_team,
+            self.studium,
+        ]
+        return hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()
+
     def _make_google_calendar_link(self):
         """googleカレンダーに追加できるURLを生成する。
 
@@ -106,11 +197,7 @@ class Schedule:
         """
         title = self.category + " (" + self.home_team + " vs " + self.away_team + ")"
         start_date = self.kickoff_time.astimezone(timezone.utc)
-        if self.category == "サテライト":
-            game_time = 60
-        else:
-            game_time = 90
-        end_date = start_date + timedelta(minutes=game_time)
+        end_date = self.end_time.astimezone(timezone.utc)
         return (
             "https://www.google.com/calendar/event?"
             + "action="
@@ -163,3 +250,249 @@ class ScheduleFactory(Factory):
 
         """
         self.__items.append(item)
+
+
+class ScheduleBatch(Sequence):
+    """列ごとに保持する試合スケジュールのリスト
+
+    データベースから読み込んだ大量の試合スケジュールを、1件ずつScheduleクラスの
+    オブジェクトにせず列ごとのリストに保持する。チーム名、カテゴリ、試合会場は
+    同じ値が繰り返し現れるため、値のリストと番号の配列に分けて保持する。
+    Scheduleクラスのオブジェクトは要素を参照したときに作成する。
+
+    Attributes:
+        COLUMNS (tuple of str): extend_rowsに渡す行の列の順番。
+        teams (list of str): チーム名の一覧。
+        categories (list of str): カテゴリの一覧。
+        studiums (list of str): 試合会場の一覧。
+
+    """
+
+    COLUMNS = (
+        "serial_number",
+        "category",
+        "match_number",
+        "match_date",
+        "kickoff_time",
+        "home_team",
+        "away_team",
+        "studium",
+        "end_time",
+        "google_calendar_link",
+    )
+
+    def __init__(self, rows=None):
+        """
+        Args:
+            rows (iterable of dict, optional): 試合スケジュールを表すハッシュ。
+                データベースのカーソルの行も指定できる。
+
+        """
+        self.__serial_numbers = list()
+        self.__match_numbers = list()
+        self.__match_dates = list()
+        self.__kickoff_times = list()
+        self.__end_times = list()
+        self.__google_calendar_links = list()
+        self.__categories = array("I")
+        self.__home_teams = array("I")
+        self.__away_teams = array("I")
+        self.__studiums = array("I")
+        self.__category_values = list()
+        self.__category_codes = dict()
+        self.__team_values = list()
+        self.__team_codes = dict()
+        self.__studium_values = list()
+        self.__studium_codes = dict()
+        if rows is not None:
+            self.extend(rows)
+
+    @property
+    def teams(self) -> list:
+        return self.__team_values
+
+    @property
+    def categories(self) -> list:
+        return self.__category_values
+
+    @property
+    def studiums(self) -> list:
+        return self.__studium_values
+
+    @staticmethod
+    def _encode(value: str, values: list, codes: dict) -> int:
+        """値に対応する番号を返す。初めて現れた値は一覧に追加する。
+
+        Args:
+            value (str): 値。
+            values (list of str): 値の一覧。
+            codes (dict): 値から番号への辞書。
+
+        Returns:
+            code (int): 値の番号。
+
+        """
+        code = codes.get(value)
+        if code is None:
+            code = len(values)
+            codes[value] = code
+            values.append(value)
+        return code
+
+    def append(self, row) -> None:
+        """試合スケジュールを追加する。
+
+        Args:
+            row (dict): 試合スケジュールを表すハッシュ。
+
+        """
+        self.__serial_numbers.append(row["serial_number"])
+        self.__match_numbers.append(row["match_number"])
+        self.__match_dates.append(row["match_date"])
+        self.__kickoff_times.append(row["kickoff_time"])
+        # 取り込み時に保存した値がない行は、Scheduleオブジェクトで計算する。
+        self.__end_times.append(row.get("end_time"))
+        self.__google_calendar_links.append(row.get("google_calendar_link"))
+        self.__categories.append(
+            self._encode(row["category"], self.__category_values, self.__category_codes)
+        )
+        self.__home_teams.append(
+            self._encode(row["home_team"], self.__team_values, self.__team_codes)
+        )
+        self.__away_teams.append(
+            self._encode(row["away_team"], self.__team_values, self.__team_codes)
+        )
+        self.__studiums.append(
+            self._encode(row["studium"], self.__studium_values, self.__studium_codes)
+        )
+
+    def extend(self, rows) -> None:
+        """複数の試合スケジュールを追加する。
+
+        Args:
+            rows (iterable of dict): 試合スケジュールを表すハッシュ。
+
+        """
+        for row in rows:
+            self.append(row)
+
+    def extend_rows(self, rows) -> None:
+        """COLUMNSの順に値を並べたタプルの行から、試合スケジュールを追加する。
+
+        データベースから読み込んだ行を、行ごとに辞書を作らず列ごとにまとめて
+        追加する。
+
+        Args:
+            rows (iterable of tuple): COLUMNSの順に値を並べた行。
+
+        """
+        columns = list(zip(*rows))
+        if not columns:
+            return
+        (
+            serial_numbers,
+            categories,
+            match_numbers,
+            match_dates,
+            kickoff_times,
+            home_teams,
+            away_teams,
+            studiums,
+            end_times,
+            google_calendar_links,
+        ) = columns
+        self.__serial_numbers.extend(serial_numbers)
+        self.__match_numbers.extend(match_numbers)
+        self.__match_dates.extend(match_dates)
+        self.__kickoff_times.extend(kickoff_times)
+        self.__end_times.extend(end_times)
+        self.__google_calendar_links.extend(google_calendar_links)
+        encode = self._encode
+        self.__categories.extend(
+            encode(value, self.__category_values, self.__category_codes)
+            for value in categories
+        )
+        self.__home_teams.extend(
+            encode(value, self.__team_values, self.__team_codes) for value in home_teams
+        )
+        self.__away_teams.extend(
+            encode(value, self.__team_values, self.__team_codes) for value in away_teams
+        )
+        self.__studiums.extend(
+            encode(value, self.__studium_values, self.__studium_codes)
+            for value in studiums
+        )
+
+    def column(self, name: str) -> list:
+        """1列分の値をリストで返す。出力処理などで列ごとに値を使う場合に利用する。
+
+        Args:
+            name (str): Scheduleクラスの属性名。
+
+        Returns:
+            values (list): 列の値のリスト。
+
+        """
+        if name == "serial_number":
+            return list(self.__serial_numbers)
+        elif name == "match_number":
+            return list(self.__match_numbers)
+        elif name == "match_date":
+            return list(self.__match_dates)
+        elif name == "kickoff_time":
+            return list(self.__kickoff_times)
+        elif name == "end_time":
+            return [schedule.end_time for schedule in self]
+        elif name == "google_calendar_link":
+            return [schedule.google_calendar_link for schedule in self]
+        elif name == "category":
+            return [self.__category_values[code] for code in self.__categories]
+        elif name == "home_team":
+            return [self.__team_values[code] for code in self.__home_teams]
+        elif name == "away_team":
+            return [self.__team_values[code] for code in self.__away_teams]
+        elif name == "studium":
+            return [self.__studium_values[code] for code in self.__studiums]
+        raise KeyError(name)
+
+    def __len__(self) -> int:
+        return len(self.__serial_numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        # 追加したときの値をそのまま使うため、型は確認しない。
+        return Schedule._from_trusted(
+            self.__serial_numbers[index],
+            self.__category_values[self.__categories[index]],
+            self.__match_numbers[index],
+            self.__match_dates[index],
+            self.__kickoff_times[index],
+            self.__team_values[self.__home_teams[index]],
+            self.__team_values[self.__away_teams[index]],
+            self.__studium_values[self.__studiums[index]],
+            self.__end_times[index],
+            self.__google_calendar_links[index],
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ScheduleBatch):
+            columns = [
+                "serial_number",
+                "category",
+                "match_number",
+                "match_date",
+                "kickoff_time",
+                "home_team",
+                "away_team",
+                "studium",
+            ]
+            return all(self.column(name) == other.column(name) for name in columns)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return "ScheduleBatch(" + str(len(self)) + " schedules)"
@@ -1,41 +1,67 @@
+import codecs
+import hashlib
+import io
 import re
+from abc import ABCMeta, abstractmethod
 from datetime import date, datetime, timezone
+from html.parser import HTMLParser
 from typing import Optional
 
-import numpy as np
-import pandas as pd
+import openpyxl
 import requests
-from bs4 import BeautifulSoup
-from requests import HTTPError, Timeout
+from requests import RequestException
 
+from afajycal.cache import DownloadCache
 from afajycal.config import Config
 from afajycal.errors import HTMLDownloadError
 from afajycal.logs import AppLog
 
 
-class DownloadedHTML:
-    """試合スケジュールHTMLページのダウンロード
+class DownloadedData:
+    """Webサイトからダウンロードしたデータを格納するモデルの基底クラス
 
-    旭川地区サッカー協会第3種委員会Webサイトから試合スケジュールのページを
-    ダウンロードしてデータに変換する。
+    キャッシュが指定された場合は条件付きリクエストを送信し、サーバ側で
+    更新されていなければキャッシュの内容を利用する。
 
     Attributes:
-        content (str): 試合スケジュールページのHTMLファイルの文字列データ
+        digest (str): ダウンロードしたデータのSHA-256ハッシュ値
 
     """
 
-    def __init__(self, afa_url: str):
+    def __init__(
+        self,
+        cache: Optional[DownloadCache] = None,
+        session: Optional[requests.Session] = None,
+        timeout: Optional[float] = None,
+    ):
         """
         Args:
-            afa_url (str): 試合スケジュールWebページのURL
+            cache (:obj:`DownloadCache`, optional): ダウンロードキャッシュ
+            session (:obj:`requests.Session`, optional): 複数のダウンロードで
+                接続を使い回すためのセッション。指定しない場合はrequests.getを使う。
+            timeout (float, optional): 接続・読み込みのタイムアウト秒数
 
         """
         self.__logger = AppLog()
-        self.__content = self._get_html_content(afa_url)
+        self.__cache = cache
+        self.__session = session
+        self.__timeout = timeout
+        self.__digest = None
 
     @property
-    def content(self) -> bytes:
-        return self.__content
+    def digest(self) -> Optional[str]:
+        return self.__digest
+
+    def _set_digest(self, content) -> None:
+        """ダウンロードしたデータのハッシュ値を記録する。
+
+        Args:
+            content (bytes): ダウンロードしたデータ
+
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self.__digest = hashlib.sha256(content).hexdigest()
 
     def _info_log(self, message: str) -> None:
         """AppLog.infoのラッパー
@@ -55,31 +81,115 @@ class DownloadedHTML:
         """
         self.__logger.error(message)
 
-    def _get_html_content(self, afa_url) -> bytes:
-        """旭川地区サッカー協会第3種委員会WebサイトからHTMLファイルのデータを取得
+    def _request(self, afa_url: str, headers: dict):
+        """requests.get、またはセッションのgetのラッパー
 
         Args:
-            afa_url (str): HTMLファイルのURL
+            afa_url (str): ダウンロードするファイルのURL
+            headers (dict): リクエストヘッダ
 
         Returns:
-            content (bytes): HTMLコンテンツデータ
+            response (:obj:`requests.Response`): レスポンス
 
         """
+        kwargs = {"headers": headers}
+        if self.__timeout is not None:
+            kwargs["timeout"] = self.__timeout
+        get = requests.get if self.__session is None else self.__session.get
         try:
-            response = requests.get(afa_url)
-            self._info_log("HTMLファイルのダウンロードに成功しました。")
-        except (ConnectionError, Timeout, HTTPError):
+            response = get(afa_url, **kwargs)
+        except (ConnectionError, RequestException):
             message = "cannot connect to web server."
             self._error_log(message)
             raise HTMLDownloadError(message)
+        return response
+
+    def _download(self, afa_url: str) -> bytes:
+        """旭川地区サッカー協会第3種委員会Webサイトからファイルのデータを取得
+
+        Args:
+            afa_url (str): ダウンロードするファイルのURL
+
+        Returns:
+            content (bytes): ファイルのデータ
+
+        """
+        headers = dict()
+        if self.__cache is not None:
+            headers = self.__cache.get_request_headers(afa_url)
+        response = self._request(afa_url, headers)
+        if response.status_code == 304 and self.__cache is not None:
+            entry = self.__cache.get(afa_url)
+            if entry is not None:
+                self.__cache.touch(afa_url)
+                self._info_log("ファイルは更新されていないためキャッシュを使用します。")
+                return entry["content"]
+            # 条件付きリクエスト後にキャッシュが消えた場合は取得し直す。
+            response = self._request(afa_url, dict())
         if response.status_code != 200:
             message = "cannot get HTML contents."
             self._error_log(message)
             raise HTMLDownloadError(message)
+        self._info_log("ファイルのダウンロードに成功しました。")
+        if self.__cache is not None:
+            self.__cache.save(
+                afa_url,
+                response.content,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
         return response.content
 
 
-class DownloadedExcel:
+class DownloadedHTML(DownloadedData):
+    """試合スケジュールHTMLページのダウンロード
+
+    旭川地区サッカー協会第3種委員会Webサイトから試合スケジュールのページを
+    ダウンロードしてデータに変換する。
+
+    Attributes:
+        content (str): 試合スケジュールページのHTMLファイルの文字列データ
+        digest (str): HTMLファイルのデータのハッシュ値
+
+    """
+
+    def __init__(
+        self,
+        afa_url: str,
+        cache: Optional[DownloadCache] = None,
+        session: Optional[requests.Session] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            afa_url (str): 試合スケジュールWebページのURL
+            cache (:obj:`DownloadCache`, optional): ダウンロードキャッシュ
+            session (:obj:`requests.Session`, optional): 共有するセッション
+            timeout (float, optional): 接続・読み込みのタイムアウト秒数
+
+        """
+        DownloadedData.__init__(self, cache, session, timeout)
+        self.__content = self._get_html_content(afa_url)
+        self._set_digest(self.__content)
+
+    @property
+    def content(self) -> bytes:
+        return self.__content
+
+    def _get_html_content(self, afa_url) -> bytes:
+        """旭川地区サッカー協会第3種委員会WebサイトからHTMLファイルのデータを取得
+
+        Args:
+            afa_url (str): HTMLファイルのURL
+
+        Returns:
+            content (bytes): HTMLコンテンツデータ
+
+        """
+        return self._download(afa_url)
+
+
+class DownloadedExcel(DownloadedData):
     """試合スケジュールExcelファイルのダウンロード
 
     旭川地区サッカー協会第3種委員会Webサイトから試合スケジュールのExcelを
@@ -87,44 +197,269 @@ class DownloadedExcel:
 
     Attributes:
         lists (list of list): 試合スケジュールExcelファイルの二次元配列データ
+        digest (str): Excelファイルのデータのハッシュ値
 
     """
 
-    def __init__(self, afa_url: str):
+    def __init__(
+        self,
+        afa_url: str,
+        cache: Optional[DownloadCache] = None,
+        session: Optional[requests.Session] = None,
+        timeout: Optional[float] = None,
+    ):
         """
         Args:
-            afa_url (str): 試合スケジュール excelファイルのURL
+            afa_url (str): 試合スケジュール excelファイルのURLまたはパス
+            cache (:obj:`DownloadCache`, optional): ダウンロードキャッシュ
+            session (:obj:`requests.Session`, optional): 共有するセッション
+            timeout (float, optional): 接続・読み込みのタイムアウト秒数
 
         """
-        self.__lists = self._get_worksheet_lists(afa_url)
+        DownloadedData.__init__(self, cache, session, timeout)
+        if re.search(r"^https?://", afa_url):
+            content = self._download(afa_url)
+        else:
+            with open(afa_url, "rb") as f:
+                content = f.read()
+        self._set_digest(content)
+        self.__source = io.BytesIO(content)
+        self.__lists = None
 
     @property
     def lists(self) -> list:
+        # 更新がなければ呼び出し側で読み飛ばせるよう、初めて参照されたときに変換する。
+        if self.__lists is None:
+            self.__lists = list(self.iter_rows())
         return self.__lists
 
-    def _get_worksheet_lists(self, afa_url) -> list:
-        """Excelファイルから二次元配列を抽出
+    @staticmethod
+    def _normalize_cell(value) -> str:
+        """セルの値を文字列に変換する。
+
+        空のセルは空文字列、整数の値を持つ浮動小数点数は整数の文字列にする。
 
         Args:
-            afa_url (str): ExcelファイルのURL
+            value: セルの値
 
         Returns:
-            worksheet_lists (list of list): Excelファイルの二次元配列データ
+            normalized_value (str): セルの値の文字列
 
         """
-        df = pd.read_excel(
-            afa_url,
-            sheet_name="日程順",
-            header=None,
-            index_col=None,
-            skiprows=range(1),
-            dtype=str,
-        )
-        df.replace(np.nan, "", inplace=True)
-        return df.values.tolist()
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def iter_rows(self):
+        """Excelファイルの「日程順」シートの行を見出し行を除いて1行ずつ返す。
+
+        読み取り専用モードで開き、シート全体を読み込まずに少しずつ変換する。
 
+        Yields:
+            row (list of str): 1行分のセルの文字列のリスト。列数はシートの最大列数に揃える。
 
-class ScrapedData:
+        """
+        self.__source.seek(0)
+        workbook = openpyxl.load_workbook(self.__source, read_only=True, data_only=True)
+        try:
+            worksheet = workbook["日程順"]
+            max_column = worksheet.max_column or 0
+            # シートに記録された範囲は実際より広い場合があるため、空行で埋めない。
+            worksheet.reset_dimensions()
+            normalize = self._normalize_cell
+            rows = worksheet.iter_rows(min_row=2, values_only=True)
+            for row in rows:
+                values = [normalize(value) for value in row]
+                if len(values) < max_column:
+                    values += [""] * (max_column - len(values))
+                yield values
+        finally:
+            workbook.close()
+
+
+class HTMLTableParser(HTMLParser):
+    """border属性が1のtable要素から行ごとにtd要素の文字列を取り出す。
+
+    HTML全体の木構造は作らず、tr要素の中だけを小さな木として組み立て、
+    tr要素が閉じるたびに行を取り出せるようにする。td要素の値は
+    BeautifulSoupのTag.stringと同じ規則で決める。子要素が1つだけの場合は
+    その文字列（子がタグであればその中の文字列）、それ以外はNoneとなる。
+
+    """
+
+    # 終了タグを持たない要素。BeautifulSoupのhtml.parserと同じものを扱う。
+    VOID_ELEMENTS = frozenset(
+        [
+            "area",
+            "base",
+            "basefont",
+            "bgsound",
+            "br",
+            "col",
+            "command",
+            "embed",
+            "frame",
+            "hr",
+            "image",
+            "img",
+            "input",
+            "isindex",
+            "keygen",
+            "link",
+            "menuitem",
+            "meta",
+            "nextid",
+            "param",
+            "source",
+            "spacer",
+            "track",
+            "wbr",
+        ]
+    )
+
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        # 開いている要素ごとに(タグ名, tr要素内の節, 対象のtableかどうか)を積む。
+        self.__stack = list()
+        self.__table_depth = 0
+        self.__text_continued = False
+        self.__rows = list()
+
+    def pop_rows(self) -> list:
+        """これまでに閉じたtr要素の行を返し、保持している行を空にする。
+
+        Returns:
+            rows (list of list): td要素の文字列のリスト。文字列がないtd要素はNone。
+
+        """
+        rows = self.__rows
+        self.__rows = list()
+        return rows
+
+    def _get_current_node(self) -> Optional[list]:
+        """文字列を追加するtr要素内の節を返す。tr要素の外ではNone。"""
+        if self.__stack:
+            return self.__stack[-1][1]
+        return None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self.__text_continued = False
+        parent = self._get_current_node()
+        node = None
+        if parent is not None or (tag == "tr" and self.__table_depth > 0):
+            # 節は[タグ名, 子のリスト]。子は文字列または節。
+            node = [tag, list()]
+            if parent is not None:
+                parent[1].append(node)
+        if tag in self.VOID_ELEMENTS:
+            return
+        is_table = tag == "table" and dict(attrs).get("border") == "1"
+        if is_table:
+            self.__table_depth += 1
+        self.__stack.append((tag, node, is_table))
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        self.__text_continued = False
+        # 対応する開始タグがなければ無視し、あれば間の要素もまとめて閉じる。
+        for index in range(len(self.__stack) - 1, -1, -1):
+            if self.__stack[index][0] == tag:
+                self._close_elements(index)
+                return
+
+    def _close_elements(self, index: int) -> None:
+        """指定した位置より上に積まれた要素を閉じる。
+
+        Args:
+            index (int): 閉じる要素のうち最も外側の要素の位置。
+
+        """
+        while len(self.__stack) > index:
+            tag, node, is_table = self.__stack.pop()
+            if is_table:
+                self.__table_depth -= 1
+            # 入れ子のtr要素も含め、最も外側のtr要素が閉じたときに行を取り出す。
+            if node is not None and self._get_current_node() is None:
+                self._add_rows(node)
+
+    def _add_rows(self, node: list) -> None:
+        """tr要素の節とその中のtr要素の行を文書の順に追加する。
+
+        Args:
+            node (list): tr要素の節。
+
+        """
+        if node[0] == "tr":
+            self.__rows.append([self._get_string(td) for td in self._find(node, "td")])
+        for child in node[1]:
+            if isinstance(child, list):
+                self._add_rows(child)
+
+    @classmethod
+    def _find(cls, node: list, tag: str):
+        """子孫の節から指定したタグの節を文書の順に返す。
+
+        Args:
+            node (list): 検索する節。
+            tag (str): タグ名。
+
+        Yields:
+            node (list): 見つかった節。
+
+        """
+        for child in node[1]:
+            if isinstance(child, list):
+                if child[0] == tag:
+                    yield child
+                yield from cls._find(child, tag)
+
+    @classmethod
+    def _get_string(cls, node: list) -> Optional[str]:
+        """BeautifulSoupのTag.stringと同じ規則で節の文字列を返す。
+
+        Args:
+            node (list): 節。
+
+        Returns:
+            string (str): 節の文字列。子が1つだけでない場合はNone。
+
+        """
+        if len(node[1]) != 1:
+            return None
+        child = node[1][0]
+        if isinstance(child, str):
+            return child
+        return cls._get_string(child)
+
+    def handle_data(self, data: str) -> None:
+        node = self._get_current_node()
+        if node is None:
+            return
+        # 途中で分割されて渡された文字列は1つにまとめる。
+        if self.__text_continued:
+            node[1][-1] += data
+        else:
+            node[1].append(data)
+            self.__text_continued = True
+
+    def handle_comment(self, data: str) -> None:
+        self.__text_continued = False
+        node = self._get_current_node()
+        if node is not None:
+            node[1].append(data)
+
+    def close(self) -> None:
+        HTMLParser.close(self)
+        self._close_elements(0)
+
+
+class ScrapedData(metaclass=ABCMeta):
     """Webサイトから取得したデータを格納するモデルの基底クラス
 
     Attributes:
@@ -132,14 +467,64 @@ class ScrapedData:
 
     """
 
-    def __init__(self):
-        self.__this_year = Config.THIS_YEAR
+    def __init__(self, this_year: Optional[int] = None):
+        """
+        Args:
+            this_year (int, optional): 試合スケジュールの年度。
+                指定しない場合はConfig.THIS_YEAR。
+
+        """
+        self.__this_year = Config.THIS_YEAR if this_year is None else this_year
         self.__JST = Config.JST
+        self.__schedule_data = None
 
     @property
     def this_year(self) -> int:
         return self.__this_year
 
+    @property
+    def schedule_data(self) -> list:
+        if self.__schedule_data is None:
+            self.__schedule_data = list(self.iter_schedule_data())
+        return self.__schedule_data
+
+    def iter_schedule_data(self):
+        """試合スケジュールを表すハッシュを1件ずつ返す。
+
+        取り出した行ごとに1回だけ変換し、全件をリストにしない。
+
+        Yields:
+            schedule_data (dict): 試合スケジュールを表すハッシュ
+
+        """
+        for row in self._get_rows():
+            schedule_data = self._extract_schedule_data(row)
+            if schedule_data is not None:
+                yield schedule_data
+
+    @abstractmethod
+    def _get_rows(self):
+        """試合スケジュールの行を返す。派生クラスで実装する。
+
+        Returns:
+            rows (iterable of list): 試合スケジュールの配列
+
+        """
+        pass
+
+    @abstractmethod
+    def _extract_schedule_data(self, row: list) -> Optional[dict]:
+        """試合スケジュールデータへの変換。派生クラスで実装する。
+
+        Args:
+            row (list): 試合スケジュールの配列
+
+        Returns:
+            schedule_data (dict): 試合スケジュールを表すハッシュ
+
+        """
+        pass
+
     @property
     def JST(self) -> timezone:
         return self.__JST
@@ -238,48 +623,108 @@ class ScrapedHTMLData(ScrapedData):
 
     """
 
-    def __init__(self, downloaded_html: DownloadedHTML):
+    def __init__(
+        self, downloaded_html: DownloadedHTML, this_year: Optional[int] = None
+    ):
         """
         Args:
             downloaded_html (:obj:`DownloadedHTML`): ダウンロードした
                 試合スケジュールHTMLコンテンツデータを要素に持つオブジェクト。
+            this_year (int, optional): 試合スケジュールの年度。
+                指定しない場合はConfig.THIS_YEAR。
 
         """
-        ScrapedData.__init__(self)
-        self.__schedule_data = list()
-        for row in self._get_table_values(downloaded_html):
-            if not self._extract_schedule_data(row) is None:
-                self.__schedule_data.append(self._extract_schedule_data(row))
+        ScrapedData.__init__(self, this_year)
+        self.__downloaded_html = downloaded_html
 
-    @property
-    def schedule_data(self) -> list:
-        return self.__schedule_data
+    def _get_rows(self):
+        """HTMLファイルのtableの行を返す。
 
-    def _get_table_values(self, downloaded_html: DownloadedHTML) -> list:
-        """試合スケジュールHTMLからtableの内容を抽出して二次元配列に格納する。
+        Returns:
+            rows (iterable of list): tableの1行分のtd要素の文字列のリスト
+
+        """
+        return self._get_table_values(self.__downloaded_html)
+
+    @staticmethod
+    def _detect_encoding(content: bytes) -> str:
+        """HTMLファイルの文字コードを判定する。
+
+        BOM、meta要素で宣言された文字コードの順に確認し、宣言がないか宣言どおりに
+        変換できない場合はUTF-8、Shift_JIS(CP932)、EUC-JPの順に変換を試す。
+
+        Args:
+            content (bytes): HTMLファイルのデータ
+
+        Returns:
+            encoding (str): 文字コード名
+
+        """
+        for bom, encoding in (
+            (codecs.BOM_UTF8, "utf-8-sig"),
+            (codecs.BOM_UTF16_LE, "utf-16"),
+            (codecs.BOM_UTF16_BE, "utf-16"),
+        ):
+            if content.startswith(bom):
+                return encoding
+
+        candidates = list()
+        match = re.search(
+            rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""",
+            content[:4096],
+            re.IGNORECASE,
+        )
+        if match:
+            try:
+                candidates.append(codecs.lookup(match.group(1).decode("ascii")).name)
+            except LookupError:
+                pass
+        candidates += ["utf-8", "cp932", "euc_jp"]
+        for encoding in candidates:
+            # 変換した文字列は保持せず、変換できるかどうかだけを確認する。
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                for start in range(0, len(content), 65536):
+                    decoder.decode(content[start : start + 65536])
+                decoder.decode(b"", final=True)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return "cp932"
+
+    def _get_table_values(self, downloaded_html: DownloadedHTML):
+        """試合スケジュールHTMLからtableの内容を1行ずつ取り出す。
+
+        HTML全体を読み込んでから解析せず、少しずつ文字列に変換しながら
+        解析して、tr要素が閉じるたびにその行を返す。
 
         Args:
             downloaded_html (:obj:`DownloadedHTML`): ダウンロードした
                 試合スケジュールHTMLコンテンツデータを要素に持つオブジェクト。
 
-        Returns:
-            table_values (list of list): tableの内容で構成される二次元配列。
-
-        """
-        soup = BeautifulSoup(downloaded_html.content, "html.parser")
-        table_values = list()
-        for table in soup.find_all("table", attrs={"border": "1"}):
-            for tr in table.find_all("tr"):
-                row = list()
-                val = ""
-                for td in tr.find_all("td"):
-                    if td.string is None:
-                        val = ""
-                    else:
-                        val = td.string.strip()
-                    row.append(val)
-                table_values.append(row)
-        return table_values
+        Yields:
+            row (list of str): tableの1行分のtd要素の文字列のリスト。
+
+        """
+        content = downloaded_html.content
+        if isinstance(content, str):
+            decoder = None
+        else:
+            encoding = self._detect_encoding(content)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        parser = HTMLTableParser()
+        for start in range(0, len(content), 65536):
+            chunk = content[start : start + 65536]
+            if decoder is not None:
+                chunk = decoder.decode(chunk)
+            parser.feed(chunk)
+            for row in parser.pop_rows():
+                yield ["" if val is None else val.strip() for val in row]
+        if decoder is not None:
+            parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        for row in parser.pop_rows():
+            yield ["" if val is None else val.strip() for val in row]
 
     def _extract_schedule_data(self, row: list) -> Optional[dict]:
         """試合スケジュールデータへの変換
@@ -347,22 +792,178 @@ class ScrapedExcelData(ScrapedData):
 
     """
 
-    def __init__(self, downloaded_excel: DownloadedExcel):
+    def __init__(
+        self,
+        downloaded_excel: DownloadedExcel,
+        vectorized: bool = False,
+        chunk_size: int = 5000,
+        this_year: Optional[int] = None,
+    ):
         """
         Args:
             downloaded_excel (:obj:`DownloadedExcel`): ダウンロードした
                 試合スケジュールExcelデータを要素に持つオブジェクト。
+            vectorized (bool, optional): Trueの場合はpandasを使い、chunk_size行ずつ
+                まとめて変換する。pandasのインポートに時間がかかり、1行ずつ変換する
+                場合より速くはならないため、デフォルトのFalseでは1行ずつ変換する。
+            chunk_size (int, optional): まとめて変換する行数。デフォルトは5000。
+            this_year (int, optional): 試合スケジュールの年度。
+                指定しない場合はConfig.THIS_YEAR。
 
         """
-        ScrapedData.__init__(self)
-        self.__schedule_data = list()
-        for row in downloaded_excel.lists:
-            if not self._extract_schedule_data(row) is None:
-                self.__schedule_data.append(self._extract_schedule_data(row))
+        ScrapedData.__init__(self, this_year)
+        self.__downloaded_excel = downloaded_excel
+        self.__vectorized = vectorized
+        self.__chunk_size = chunk_size
 
-    @property
-    def schedule_data(self) -> list:
-        return self.__schedule_data
+    def _get_rows(self):
+        """Excelファイルの行を返す。
+
+        Returns:
+            rows (iterable of list): 1行分のセルの文字列のリスト
+
+        """
+        return self.__downloaded_excel.iter_rows()
+
+    def _import_pandas(self):
+        """まとめて変換する場合にpandasをインポートする。
+
+        pandasは必須の依存パッケージではないため、使用するときにだけインポートする。
+
+        Returns:
+            pandas (module): pandasモジュール。1行ずつ変換する場合はNone。
+
+        Raises:
+            ImportError: vectorizedがTrueでpandasがインストールされていない場合。
+
+        """
+        if not self.__vectorized:
+            return None
+        import pandas
+
+        return pandas
+
+    def iter_schedule_data(self):
+        """試合スケジュールを表すハッシュを1件ずつ返す。
+
+        pandasを使う場合はchunk_size行ずつまとめて変換する。
+
+        Yields:
+            schedule_data (dict): 試合スケジュールを表すハッシュ
+
+        """
+        pd = self._import_pandas()
+        if pd is None:
+            yield from ScrapedData.iter_schedule_data(self)
+            return
+        chunk = list()
+        for row in self._get_rows():
+            chunk.append(row)
+            if len(chunk) >= self.__chunk_size:
+                yield from self._extract_schedule_frame(pd, chunk)
+                chunk = list()
+        if chunk:
+            yield from self._extract_schedule_frame(pd, chunk)
+
+    @staticmethod
+    def _get_valid_numbers(pd, values, upper: int):
+        """get_month、get_dayと同じ規則で数値に変換する。
+
+        1桁または2桁の数字でない値と、1からupperの範囲外の値は1にする。
+
+        Args:
+            pd (module): pandasモジュール
+            values (:obj:`pandas.Series`): 月・日を表す文字列
+            upper (int): 値の上限
+
+        Returns:
+            numbers (:obj:`pandas.Series`): 数値
+
+        """
+        is_number = values.str.match(r"^[0-9]{1,2}$")
+        numbers = pd.to_numeric(values.where(is_number, "1").str.strip())
+        return numbers.where((1 <= numbers) & (numbers <= upper), 1)
+
+    def _extract_schedule_frame(self, pd, rows: list) -> list:
+        """複数行をまとめて試合スケジュールデータへ変換する。
+
+        _extract_schedule_dataと同じ規則で、月・日・キックオフ時刻の列を
+        まとめて数値に変換し、タイムゾーン付きの日時を作成する。
+
+        Args:
+            pd (module): pandasモジュール
+            rows (list of list): 試合スケジュールの配列のリスト
+
+        Returns:
+            schedule_data (list of dict): 試合スケジュールを表すハッシュのリスト
+
+        Raises:
+            ValueError: 日付・時刻として正しくない値があった場合。
+
+        """
+        df = pd.DataFrame(rows, dtype=object)
+        # 連番のない列、日付が入っていない列はスキップ。
+        df = df[(df[0] != "") & (df[3] != "") & (df[4] != "")]
+        if df.empty:
+            return list()
+        df = df.astype(str)
+
+        month = self._get_valid_numbers(pd, df[3], 12)
+        day = self._get_valid_numbers(pd, df[4], 31)
+        time = df[8].str.extract(r"^([0-9]{1,2}):([0-9]{2})")
+        hour = pd.to_numeric(time[0]).fillna(0).astype(int)
+        minute = pd.to_numeric(time[1]).fillna(0).astype(int)
+        hour = hour.where(hour <= 24, 0)
+        # get_timeと同じく、分が範囲外の場合は時間を0にする。
+        hour = hour.where(minute <= 59, 0)
+        # pandasでは翌日や次の時間に繰り上がるため、1行ずつ変換する場合と同じく例外にする。
+        if (hour == 24).any():
+            raise ValueError("hour must be in 0..23")
+        if (minute > 59).any():
+            raise ValueError("minute must be in 0..59")
+        year = self.this_year + (month < 4).astype(int)
+        kickoff_times = pd.to_datetime(
+            pd.DataFrame(
+                {
+                    "year": year,
+                    "month": month,
+                    "day": day,
+                    "hour": hour,
+                    "minute": minute,
+                }
+            )
+        )
+        kickoff_times = kickoff_times.dt.tz_localize(self.JST).dt.to_pydatetime()
+
+        return [
+            {
+                "serial_number": serial_number,
+                "category": category,
+                "match_number": match_number,
+                "match_date": kickoff_time.date(),
+                "kickoff_time": kickoff_time,
+                "home_team": home_team,
+                "away_team": away_team,
+                "studium": studium,
+            }
+            for (
+                serial_number,
+                category,
+                match_number,
+                kickoff_time,
+                home_team,
+                away_team,
+                studium,
+            ) in zip(
+                df[0].tolist(),
+                df[5].tolist(),
+                df[1].tolist(),
+                kickoff_times,
+                df[9].str.replace("\u3000", "").tolist(),
+                df[11].str.replace("\u3000", "").tolist(),
+                df[7].tolist(),
+            )
+        ]
 
     def _extract_schedule_data(self, row: list) -> Optional[dict]:
         """試合スケジュールデータへの変換
@@ -1,30 +1,82 @@
+import functools
+import os
 import re
-from datetime import date, datetime, timedelta, timezone
+import select
+import threading
+import time
+import uuid
+from datetime import date, datetime
 from typing import Optional
 
 import psycopg2
-from psycopg2.extras import DictCursor
+from psycopg2.extras import DictCursor, execute_values
 
 from afajycal.config import Config
+from afajycal.db import DB
 from afajycal.errors import DatabaseError, DataError
 from afajycal.logs import AppLog
-from afajycal.models import Schedule, ScheduleFactory
+from afajycal.models import Schedule, ScheduleBatch
+
+TEAM_NAME_PREFIX = re.compile(r"^旭川市立")
+TEAM_NAME_SUFFIX = re.compile(r"(中学校|学校|中)$")
+# pg_trgmのインデックスで部分一致検索できる入力の最小の文字数
+TRIGRAM_LENGTH = 3
+
+
+def cached_query(method):
+    """検索系メソッドの結果をQueryCacheにキャッシュするデコレータ
+
+    キャッシュのキーにはメソッド名と引数に加えてデータのバージョンを含めるため、
+    試合スケジュールを取り込んだ直後から新しい結果が返される。
+
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._get_cached(
+            method.__name__,
+            args + tuple(sorted(kwargs.items())),
+            lambda: method(self, *args, **kwargs),
+        )
+
+    return wrapper
 
 
 class ScheduleService:
     """試合スケジュールデータを扱う"""
 
-    def __init__(self, db):
+    def __init__(self, db, cache=None):
         """
         Args:
             db (:obj:`DB`): データベース操作をラップしたオブジェクト。
+            cache (:obj:`QueryCache`, optional): 検索結果のキャッシュ。
+                キャッシュした結果は呼び出し元で変更しないこと。
 
         """
 
+        self.__db = db
         self.__cursor = db.cursor()
         self.__table_name = "schedules"
+        self.__items = [
+            "serial_number",
+            "category",
+            "match_number",
+            "match_date",
+            "kickoff_time",
+            "home_team",
+            "away_team",
+            "studium",
+            "end_time",
+            "google_calendar_link",
+            "home_team_normalized",
+            "away_team_normalized",
+            "row_digest",
+            "updated_at",
+        ]
         self.__JST = Config.JST
         self.__logger = AppLog()
+        self.__cache = cache
+        self.__data_version = None
 
     def _execute(self, sql: str, parameters: tuple = None) -> bool:
         """DictCursorオブジェクトのexecuteメソッドのラッパー。
@@ -47,6 +99,25 @@ class ScheduleService:
         ) as e:
             raise DataError(e.args[0])
 
+    def _execute_values(self, sql: str, argslist: list, page_size: int) -> bool:
+        """psycopg2.extras.execute_valuesのラッパー。
+
+        Args:
+            sql (str): VALUES句のプレースホルダを1つだけ含むSQL文
+            argslist (list of tuple): 複数行分の値を格納したリスト
+            page_size (int): 1回のクエリで送信する行数
+
+        """
+        try:
+            execute_values(self.__cursor, sql, argslist, page_size=page_size)
+            return True
+        except (
+            psycopg2.DataError,
+            psycopg2.IntegrityError,
+            psycopg2.InternalError,
+        ) as e:
+            raise DataError(e.args[0])
+
     def _fetchone(self) -> DictCursor:
         """DictCursorオブジェクトのfetchoneメソッドのラッパー。
 
@@ -65,18 +136,32 @@ class ScheduleService:
         """
         return self.__cursor.fetchall()
 
-    def _get_objects(self) -> list:
-        """検索結果から試合スケジュールデータのリストを作成する。
+    def _fetch_rows(self, sql: str, parameters: tuple = None) -> list:
+        """行をタプルで返すカーソルで検索し、全ての行を返す。
+
+        DictCursorのように行ごとに列名から値を引けるようにせず、SELECTした
+        列の順番で値を取り出す検索に使う。
+
+        Args:
+            sql (str): SQL文
+            parameters (tuple): SQLにプレースホルダを使用する場合の値を格納したリスト
 
         Returns:
-            locations (list of obj:`Schedule`): 検索結果のイテレータオブジェクトのリスト
+            rows (list of tuple): 検索結果の行のリスト
 
         """
-        results = self._fetchall()
-        factory = ScheduleFactory()
-        for row in results:
-            factory.create(**row)
-        return factory.items
+        cursor = self.__db.cursor(cursor_factory=None)
+        try:
+            cursor.execute(sql, parameters)
+            return cursor.fetchall()
+        except (
+            psycopg2.DataError,
+            psycopg2.IntegrityError,
+            psycopg2.InternalError,
+        ) as e:
+            raise DataError(e.args[0])
+        finally:
+            cursor.close()
 
     def _info_log(self, message) -> None:
         """AppLogオブジェクトのinfoメソッドのラッパー。
@@ -95,44 +180,145 @@ class ScheduleService:
         """
         return self.__logger.error(message)
 
+    def _get_cached(self, name: str, args: tuple, loader):
+        """キャッシュがあればキャッシュを経由して検索結果を返す。
+
+        Args:
+            name (str): メソッド名
+            args (tuple): メソッドの引数
+            loader (callable): データベースから検索結果を取得する関数
+
+        Returns:
+            results: 検索結果
+
+        """
+        if self.__cache is None:
+            return loader()
+        key = (name, args, self.get_current_version())
+        return self.__cache.get_or_load(key, loader)
+
+    def get_current_version(self) -> int:
+        """このオブジェクトで使用するデータのバージョンを返す。
+
+        更新通知を受け取ったキャッシュがバージョンを知っていればそれを使い、
+        知らなければデータベースから取得する。バージョンは1つのオブジェクトに
+        つき1回だけ取得する。ScheduleServiceはリクエストごとに生成することを
+        想定している。
+
+        Returns:
+            version (int): データのバージョン。
+
+        """
+        if self.__data_version is None and self.__cache is not None:
+            # 更新通知を受け取っていればデータベースに問い合わせずに済ませる。
+            self.__data_version = self.__cache.version
+        if self.__data_version is None:
+            self.__data_version = self.get_data_version()
+        return self.__data_version
+
+    def get_data_version(self) -> int:
+        """試合スケジュールデータのバージョンを返す。
+
+        Returns:
+            version (int): 試合スケジュールを更新するたびに増える番号。
+
+        """
+        self._execute(
+            "SELECT version FROM data_versions WHERE name = %s;", ("schedules",)
+        )
+        row = self._fetchone()
+        if row is None:
+            return 0
+        else:
+            return row["version"]
+
+    @cached_query
+    def get_version_updated_at(self) -> Optional[datetime]:
+        """試合スケジュールデータのバージョンを更新した日時を返す。
+
+        削除だけの更新でも変わるため、Last-Modifiedにはこの日時を使う。
+        キャッシュを指定した場合は、更新通知で受け取ったバージョンごとに
+        キャッシュするため、条件付きリクエストではデータベースに問い合わせない。
+
+        Returns:
+            updated_at (:obj:`datetime.datetime`): バージョンを更新した日時。
+                更新したことがなければNone。
+
+        """
+        self._execute(
+            "SELECT updated_at FROM data_versions WHERE name = %s;", ("schedules",)
+        )
+        row = self._fetchone()
+        if row is None:
+            return None
+        else:
+            return row["updated_at"]
+
+    def bump_version(self) -> int:
+        """試合スケジュールデータのバージョンを更新する。
+
+        sync、rebuild、truncateでは自動的に呼び出される。create、create_manyで
+        登録した場合は、呼び出し元で登録後に呼び出すこと。コミットされると
+        Webアプリケーションの各ワーカーへ更新が通知される。
+
+        Returns:
+            version (int): 更新後のバージョン。
+
+        """
+        self._execute(
+            "INSERT INTO data_versions (name,version,updated_at) VALUES (%s,1,%s)"
+            + " "
+            + "ON CONFLICT(name) DO UPDATE SET"
+            + " "
+            + "version=data_versions.version+1,updated_at=EXCLUDED.updated_at"
+            + " "
+            + "RETURNING version;",
+            ("schedules", datetime.now(self.__JST)),
+        )
+        self.__data_version = None
+        version = self._fetchone()["version"]
+        # NOTIFYはコミットした時点で配信される。
+        self._execute(
+            "SELECT pg_notify(%s, %s);", (Config.NOTIFY_CHANNEL, str(version))
+        )
+        return version
+
     def truncate(self) -> None:
         """スケジュールテーブルのデータを全削除"""
 
-        state = "TRUNCATE TABLE " + self.__table_name + " RESTART IDENTITY;"
+        # 次回の取り込みがスキップされないよう、ハッシュ値の記録も削除する。
+        state = (
+            "TRUNCATE TABLE " + self.__table_name + ",teams,sources RESTART IDENTITY;"
+        )
         self._execute(state)
+        self.bump_version()
         self._info_log(self.__table_name + "テーブルを初期化しました。")
 
-    def create(self, schedule: Schedule) -> bool:
-        """データベースへ試合スケジュールデータを保存
+    def _get_upsert_state(self, multiple_rows: bool = False) -> str:
+        """試合スケジュールデータを登録・更新するSQL文を返す。
 
         Args:
-            schedule (:obj:`Schedule`): スケジュールデータのオブジェクト
+            multiple_rows (bool, optional): Trueの場合はexecute_values用に
+                VALUES句全体を1つのプレースホルダにする。デフォルトはFalse。
 
         Returns:
-            bool: データの登録が成功したらTrueを返す。
+            state (str): INSERT ... ON CONFLICT文
 
         """
-        items = [
-            "serial_number",
-            "category",
-            "match_number",
-            "match_date",
-            "kickoff_time",
-            "home_team",
-            "away_team",
-            "studium",
-            "updated_at",
-        ]
-
         column_names = ""
         place_holders = ""
         upsert = ""
-        for item in items:
+        for item in self.__items:
             column_names += "," + item
             place_holders += ",%s"
-            upsert += "," + item + "=%s"
+            upsert += "," + item + "=EXCLUDED." + item
+        if multiple_rows:
+            values_clause = "VALUES %s"
+        else:
+            values_clause = "VALUES (" + place_holders[1:] + ")"
 
-        state = (
+        # 内容が変わっていない行は更新せず、updated_atを書き換えないようにする。
+        return (
             "INSERT INTO"
             + " "
             + self.__table_name
@@ -141,18 +327,33 @@ class ScheduleService:
             + column_names[1:]
             + ")"
             + " "
-            + "VALUES ("
-            + place_holders[1:]
-            + ")"
+            + values_clause
             + " "
             + "ON CONFLICT(serial_number)"
             + " "
             + "DO UPDATE SET"
             + " "
             + upsert[1:]
+            + " "
+            + "WHERE"
+            + " "
+            + self.__table_name
+            + ".row_digest IS DISTINCT FROM EXCLUDED.row_digest"
         )
 
-        temp_values = [
+    @classmethod
+    def _get_values(cls, schedule: Schedule, updated_at: datetime) -> tuple:
+        """試合スケジュールデータを登録するSQL文に渡す値を返す。
+
+        Args:
+            schedule (:obj:`Schedule`): スケジュールデータのオブジェクト
+            updated_at (:obj:`datetime.datetime`): 更新日時
+
+        Returns:
+            values (tuple): プレースホルダに渡す値
+
+        """
+        return (
             schedule.serial_number,
             schedule.category,
             schedule.match_number,
@@ -161,25 +362,365 @@ class ScheduleService:
             schedule.home_team,
             schedule.away_team,
             schedule.studium,
-            datetime.now(timezone(timedelta(hours=+9))),
-        ]
-        # UPDATE句用にリストを重複させる。
-        values = tuple(temp_values + temp_values)
+            schedule.end_time,
+            schedule.google_calendar_link,
+            cls._trim_team_name(schedule.home_team),
+            cls._trim_team_name(schedule.away_team),
+            schedule.digest,
+            updated_at,
+        )
+
+    def create(self, schedule: Schedule) -> bool:
+        """データベースへ試合スケジュールデータを保存
 
+        Args:
+            schedule (:obj:`Schedule`): スケジュールデータのオブジェクト
+
+        Returns:
+            bool: データの登録が成功したらTrueを返す。
+
+        """
+        values = self._get_values(schedule, datetime.now(self.__JST))
         try:
-            self._execute(state, values)
+            self._execute(self._get_upsert_state(), values)
             return True
         except (DatabaseError, DataError) as e:
             self._error_log(e.message)
             return False
 
+    def create_many(self, schedules, page_size: int = 500) -> int:
+        """データベースへ複数の試合スケジュールデータをまとめて保存
+
+        複数行のVALUES句を使い、page_size件ごとに1回のクエリで登録・更新する。
+
+        Args:
+            schedules (iterable of :obj:`Schedule`): スケジュールデータのオブジェクト
+            page_size (int, optional): 1回のクエリで送信する行数。デフォルトは500。
+
+        Returns:
+            count (int): 送信した試合スケジュールの件数。
+
+        Raises:
+            DataError: SQLの実行に失敗した場合。
+
+        """
+        # 1つのINSERT文で同じ連番を2回更新できないため、後に出てきたデータを優先する。
+        updated_at = datetime.now(self.__JST)
+        argslist = dict()
+        for schedule in schedules:
+            argslist[str(schedule.serial_number)] = self._get_values(
+                schedule, updated_at
+            )
+        if not argslist:
+            return 0
+        self._execute_values(
+            self._get_upsert_state(multiple_rows=True),
+            list(argslist.values()),
+            page_size,
+        )
+        return len(argslist)
+
+    def _add_constraints(self, table_name: str) -> None:
+        """試合スケジュールテーブルの主キー・一意制約を作成する。
+
+        Args:
+            table_name (str): 制約を作成するテーブル名
+
+        """
+        self._execute(
+            "ALTER TABLE "
+            + table_name
+            + " "
+            + "ADD CONSTRAINT "
+            + table_name
+            + "_pkey PRIMARY KEY (id),"
+            + " "
+            + "ADD CONSTRAINT "
+            + table_name
+            + "_serial_number_key UNIQUE (serial_number);"
+        )
+
+    def _copy_indexes(self, table_name: str) -> list:
+        """試合スケジュールテーブルの制約以外のインデックスを別のテーブルに作成する。
+
+        トライグラムインデックスなど、マイグレーションで追加したインデックスを
+        作業用テーブルにも同じ定義で作成する。
+
+        Args:
+            table_name (str): インデックスを作成するテーブル名
+
+        Returns:
+            index_names (list of tuple): 作成したインデックス名と、
+                テーブル入れ替え後に変更するインデックス名のタプルのリスト
+
+        """
+        self._execute(
+            "SELECT indexname,indexdef FROM pg_indexes"
+            + " "
+            + "WHERE schemaname = current_schema() AND tablename = %s"
+            + " "
+            + "AND indexname NOT IN (%s, %s);",
+            (
+                self.__table_name,
+                self.__table_name + "_pkey",
+                self.__table_name + "_serial_number_key",
+            ),
+        )
+        index_names = list()
+        for row in self._fetchall():
+            new_index_name = row["indexname"] + "_new"
+            indexdef = re.sub(
+                r"^(CREATE (UNIQUE )?INDEX )\S+ ON (\S+\.)?\S+ ",
+                r"\g<1>" + new_index_name + " ON " + table_name + " ",
+                row["indexdef"],
+            )
+            self._execute(indexdef + ";")
+            index_names.append((new_index_name, row["indexname"]))
+        return index_names
+
+    def rebuild(self, schedules, batch_size: int = 500) -> int:
+        """試合スケジュールテーブルを作り直して入れ替える。
+
+        作業用テーブルへデータを登録してから制約とインデックスを作成し、同じトランザクション内で
+        テーブル名を変更して入れ替える。コミットするまで閲覧側からは元のテーブルが
+        見えるため、取り込み途中のデータが表示されることはない。
+
+        Args:
+            schedules (iterable of :obj:`Schedule`): 抽出した試合スケジュール。
+                batch_size件ずつ登録するため、ジェネレータも渡せる。
+            batch_size (int, optional): 1回のクエリで登録する行数。デフォルトは500。
+
+        Returns:
+            count (int): 登録した試合スケジュールの件数。
+
+        Raises:
+            DataError: SQLの実行に失敗した場合。
+
+        """
+        staging_table_name = self.__table_name + "_staging"
+        old_table_name = self.__table_name + "_old"
+        self._execute("DROP TABLE IF EXISTS " + staging_table_name + ";")
+        self._execute(
+            "CREATE TABLE "
+            + staging_table_name
+            + " "
+            + "(LIKE "
+            + self.__table_name
+            + " "
+            + "INCLUDING DEFAULTS);"
+        )
+
+        # 作業用テーブルには一意制約がないため、連番が重複する場合は
+        # 登録済みの行を削除して後に出てきたデータを優先する。
+        updated_at = datetime.now(self.__JST)
+        insert_state = (
+            "INSERT INTO "
+            + staging_table_name
+            + " "
+            + "("
+            + ",".join(self.__items)
+            + ") VALUES %s"
+        )
+        seen = set()
+        argslist = dict()
+        for schedule in schedules:
+            serial_number = str(schedule.serial_number)
+            if serial_number in seen and serial_number not in argslist:
+                self._execute(
+                    "DELETE FROM "
+                    + staging_table_name
+                    + " "
+                    + "WHERE serial_number = %s;",
+                    (serial_number,),
+                )
+            seen.add(serial_number)
+            argslist[serial_number] = self._get_values(schedule, updated_at)
+            if len(argslist) >= batch_size:
+                self._execute_values(insert_state, list(argslist.values()), batch_size)
+                argslist = dict()
+        if argslist:
+            self._execute_values(insert_state, list(argslist.values()), batch_size)
+        self._add_constraints(staging_table_name)
+        index_names = self._copy_indexes(staging_table_name)
+
+        # 連番のシーケンスを作業用テーブルに付け替えてから元のテーブルを削除する。
+        self._execute(
+            "ALTER SEQUENCE "
+            + self.__table_name
+            + "_id_seq OWNED BY "
+            + staging_table_name
+            + ".id;"
+        )
+        self._execute(
+            "ALTER TABLE " + self.__table_name + " RENAME TO " + old_table_name + ";"
+        )
+        self._execute(
+            "ALTER TABLE "
+            + staging_table_name
+            + " RENAME TO "
+            + self.__table_name
+            + ";"
+        )
+        self._execute("DROP TABLE " + old_table_name + ";")
+        for suffix in ["_pkey", "_serial_number_key"]:
+            self._execute(
+                "ALTER TABLE "
+                + self.__table_name
+                + " "
+                + "RENAME CONSTRAINT "
+                + staging_table_name
+                + suffix
+                + " TO "
+                + self.__table_name
+                + suffix
+                + ";"
+            )
+        for new_index_name, index_name in index_names:
+            self._execute(
+                "ALTER INDEX " + new_index_name + " RENAME TO " + index_name + ";"
+            )
+        self.refresh_teams()
+        self.bump_version()
+        self._info_log(self.__table_name + "テーブルを作り直しました。")
+        return len(seen)
+
+    def _get_row_digests(self) -> dict:
+        """登録済みの試合スケジュールのハッシュ値を連番をキーにして返す。
+
+        Returns:
+            row_digests (dict): 連番をキー、ハッシュ値を値とする辞書。
+
+        """
+        self._execute("SELECT serial_number,row_digest FROM " + self.__table_name + ";")
+        row_digests = dict()
+        for row in self._fetchall():
+            row_digests[row["serial_number"]] = row["row_digest"]
+        return row_digests
+
+    def sync(self, schedules, batch_size: int = 500) -> dict:
+        """データベースの試合スケジュールを抽出したデータと同じ状態にする。
+
+        登録済みのデータと比較し、追加・変更された試合スケジュールだけを登録し、
+        抽出したデータに含まれなくなった試合スケジュールを削除する。
+        抽出したデータはbatch_size件ずつ登録し、全件を保持しない。
+
+        Args:
+            schedules (iterable of :obj:`Schedule`): 抽出した試合スケジュール。
+                ジェネレータも渡せる。
+            batch_size (int, optional): 1回のクエリで登録する行数。デフォルトは500。
+
+        Returns:
+            summary (dict): 追加(inserted)、変更(updated)、削除(deleted)、
+                変更なし(unchanged)の件数。
+
+        """
+        current_digests = self._get_row_digests()
+        summary = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        seen = set()
+        changed_schedules = dict()
+        for schedule in schedules:
+            serial_number = str(schedule.serial_number)
+            if serial_number in seen:
+                # 連番が重複している場合は後に出てきたデータを優先する。
+                changed_schedules[serial_number] = schedule
+            else:
+                seen.add(serial_number)
+                if serial_number not in current_digests:
+                    summary["inserted"] += 1
+                elif current_digests[serial_number] != schedule.digest:
+                    summary["updated"] += 1
+                else:
+                    summary["unchanged"] += 1
+                    continue
+                changed_schedules[serial_number] = schedule
+            if len(changed_schedules) >= batch_size:
+                self.create_many(changed_schedules.values(), page_size=batch_size)
+                changed_schedules = dict()
+        self.create_many(changed_schedules.values(), page_size=batch_size)
+
+        removed = [key for key in current_digests if key not in seen]
+        if removed:
+            self._execute(
+                "DELETE FROM "
+                + self.__table_name
+                + " "
+                + "WHERE serial_number = ANY(%s);",
+                (removed,),
+            )
+            summary["deleted"] = len(removed)
+        if summary["inserted"] or summary["updated"] or summary["deleted"]:
+            self.refresh_teams()
+            self.bump_version()
+
+        self._info_log(
+            "試合スケジュールを同期しました（追加: {inserted}件、変更: {updated}件、"
+            "削除: {deleted}件、変更なし: {unchanged}件）。".format(**summary)
+        )
+        return summary
+
+    def get_source_digest(self, url: str) -> Optional[str]:
+        """前回取り込んだダウンロードデータのハッシュ値を返す。
+
+        Args:
+            url (str): ダウンロード元のURL
+
+        Returns:
+            digest (str): ハッシュ値。取り込んだことがなければNone。
+
+        """
+        self._execute("SELECT digest FROM sources WHERE url = %s;", (url,))
+        row = self._fetchone()
+        if row is None:
+            return None
+        else:
+            return row["digest"]
+
+    def get_source_digests(self) -> dict:
+        """前回取り込んだ全てのダウンロードデータのハッシュ値を返す。
+
+        Returns:
+            digests (dict): ダウンロード元のURLをキーにしたハッシュ値の辞書。
+
+        """
+        self._execute("SELECT url,digest FROM sources;")
+        return {row["url"]: row["digest"] for row in self._fetchall()}
+
+    def delete_source_digests(self, urls: list) -> None:
+        """取り込まなくなったダウンロード元のハッシュ値を削除する。
+
+        Args:
+            urls (list of str): 削除するダウンロード元のURL
+
+        """
+        if not urls:
+            return
+        self._execute("DELETE FROM sources WHERE url = ANY(%s);", (list(urls),))
+
+    def save_source_digest(self, url: str, digest: str) -> None:
+        """取り込んだダウンロードデータのハッシュ値を保存する。
+
+        Args:
+            url (str): ダウンロード元のURL
+            digest (str): ダウンロードデータのハッシュ値
+
+        """
+        self._execute(
+            "INSERT INTO sources (url,digest,updated_at) VALUES (%s,%s,%s)"
+            + " "
+            + "ON CONFLICT(url) DO UPDATE SET"
+            + " "
+            + "digest=EXCLUDED.digest,updated_at=EXCLUDED.updated_at;",
+            (url, digest, datetime.now(self.__JST)),
+        )
+
     @staticmethod
     def _trim_team_name(team_name: str) -> str:
         """チーム名整形
 
         データベースに登録されているチーム名が「旭川市立」で始まったり、
         「中学校」、「中」で終わっていないため、チーム名を検索できるよう、
-        これらの文字列を削除する。
+        これらの文字列を削除する。登録時にも同じ整形をした値を
+        home_team_normalized、away_team_normalizedカラムに保存している。
 
         Args:
             team_name (str): 元のチーム名。
@@ -188,60 +729,169 @@ class ScheduleService:
             trimed_team_name (str): 文字列削除後のチーム名。
 
         """
-        team_name = team_name.strip()
-        if re.search(r"^旭川市立", team_name):
-            team_name = team_name.replace("旭川市立", "")
-
-        if re.search(r"学校$", team_name):
-            team_name = team_name.replace("学校", "")
-
-        if re.search(r"中$", team_name):
-            team_name = team_name.replace("中", "")
-
+        team_name = TEAM_NAME_PREFIX.sub("", team_name.strip())
+        team_name = TEAM_NAME_SUFFIX.sub("", team_name)
         trimed_team_name = team_name.strip()
         return trimed_team_name
 
-    def find(
+    def _get_search_condition(
         self,
         team_name: str = None,
         category: str = None,
         match_date: date = None,
-    ) -> list:
-        """対象のチーム・カテゴリの試合スケジュールを返す。
+        date_from: date = None,
+        date_to: date = None,
+    ) -> tuple:
+        """試合スケジュールを検索するWHERE句とプレースホルダに渡す値を返す。
+
+        チーム名は整形した値の部分一致で検索する。pg_trgmは「六合」のような
+        3文字未満の入力から検索に使える3文字の組を作れないため、その場合は
+        teamsテーブルの整形済みのチーム名から一致するものを探し、B-tree
+        インデックスで試合スケジュールを検索する。
 
         Args:
             team_name(str, optional): 対象のチーム名。デフォルトはNone。
             category(str, optional): 対象のカテゴリ名。デフォルトはNone。
             match_date(:obj:`datetime.date`, optional): 基準の日時。デフォルトはNone。
+            date_from(:obj:`datetime.date`, optional): 対象期間の開始日。
+            date_to(:obj:`datetime.date`, optional): 対象期間の終了日。
 
         Returns:
-            res (list of :obj:`Schedule`): 検索結果。
+            search_condition (tuple): WHERE句の文字列と値のタプル
 
         """
+        team_condition = (
+            "(home_team_normalized LIKE %s OR away_team_normalized LIKE %s)"
+        )
         if team_name is None:
             team_name = "%"
         else:
-            team_name = "%" + self._trim_team_name(team_name) + "%"
+            team_name = self._trim_team_name(team_name)
+            if 0 < len(team_name) < TRIGRAM_LENGTH:
+                # INでは2つの条件をORでつないだときにインデックスを使えないため、
+                # 配列にしてから比較する。
+                team_names = (
+                    "ANY(ARRAY("
+                    + "SELECT normalized_name FROM teams WHERE normalized_name LIKE %s"
+                    + "))"
+                )
+                team_condition = (
+                    "(home_team_normalized = "
+                    + team_names
+                    + " OR away_team_normalized = "
+                    + team_names
+                    + ")"
+                )
+            team_name = "%" + team_name + "%"
         if category is None:
             category = "%"
         else:
             category = "%" + category + "%"
-        search_condition = (
-            "WHERE"
-            + " "
-            + "(home_team LIKE %s OR away_team LIKE %s)"
-            + " "
-            + "AND category LIKE %s"
-        )
+        search_condition = "WHERE" + " " + team_condition + " " + "AND category LIKE %s"
         search_values = (team_name, team_name, category)
         if match_date is not None:
             search_condition += " " + "AND match_date = %s"
             search_values = (search_values) + (match_date,)
-        self._execute(
+        if date_from is not None:
+            search_condition += " " + "AND match_date >= %s"
+            search_values = (search_values) + (date_from,)
+        if date_to is not None:
+            search_condition += " " + "AND match_date <= %s"
+            search_values = (search_values) + (date_to,)
+        return (search_condition, search_values)
+
+    def iter_schedules(
+        self,
+        team_name: str = None,
+        category: str = None,
+        date_from: date = None,
+        date_to: date = None,
+        after: tuple = None,
+        limit: int = 100,
+        itersize: int = 100,
+    ):
+        """対象の試合スケジュールをキックオフ日時の順に1件ずつ返す。
+
+        検索結果を全て読み込まず、サーバサイドカーソルから少しずつ取得する。
+        ページ送りはキックオフ日時と連番の組で前回の最後の行を指定する。
+
+        Args:
+            team_name(str, optional): 対象のチーム名。デフォルトはNone。
+            category(str, optional): 対象のカテゴリ名。デフォルトはNone。
+            date_from(:obj:`datetime.date`, optional): 対象期間の開始日。
+            date_to(:obj:`datetime.date`, optional): 対象期間の終了日。
+            after(tuple, optional): この(キックオフ日時, 連番)より後の
+                試合スケジュールを返す。デフォルトはNone。
+            limit(int, optional): 返す試合スケジュールの最大件数。デフォルトは100。
+            itersize(int, optional): サーバから一度に取得する行数。デフォルトは100。
+
+        Yields:
+            row (:obj:`DictRow`): 試合スケジュールの行。
+
+        """
+        search_condition, search_values = self._get_search_condition(
+            team_name, category, date_from=date_from, date_to=date_to
+        )
+        if after is not None:
+            search_condition += " " + "AND (kickoff_time,serial_number) > (%s,%s)"
+            search_values = (search_values) + (after[0], str(after[1]))
+        cursor = self.__db.cursor(name="schedules_" + uuid.uuid4().hex)
+        cursor.itersize = itersize
+        try:
+            cursor.execute(
+                "SELECT"
+                + " "
+                + "serial_number,category,match_number,match_date,kickoff_time,"
+                + "home_team,away_team,studium"
+                + " "
+                + "FROM"
+                + " "
+                + self.__table_name
+                + " "
+                + search_condition
+                + " "
+                + "ORDER BY kickoff_time,serial_number"
+                + " "
+                + "LIMIT %s;",
+                (search_values) + (limit,),
+            )
+            for row in cursor:
+                yield row
+        except (
+            psycopg2.DataError,
+            psycopg2.IntegrityError,
+            psycopg2.InternalError,
+        ) as e:
+            raise DataError(e.args[0])
+        finally:
+            cursor.close()
+
+    @cached_query
+    def find(
+        self,
+        team_name: str = None,
+        category: str = None,
+        match_date: date = None,
+    ) -> ScheduleBatch:
+        """対象のチーム・カテゴリの試合スケジュールを返す。
+
+        Args:
+            team_name(str, optional): 対象のチーム名。デフォルトはNone。
+            category(str, optional): 対象のカテゴリ名。デフォルトはNone。
+            match_date(:obj:`datetime.date`, optional): 基準の日時。デフォルトはNone。
+
+        Returns:
+            schedules (:obj:`ScheduleBatch`): 検索結果を列ごとに保持したリスト。
+                Scheduleオブジェクトは要素を参照したときに作成する。
+
+        """
+        search_condition, search_values = self._get_search_condition(
+            team_name, category, match_date
+        )
+        rows = self._fetch_rows(
             "SELECT"
             + " "
-            + "serial_number,category,match_number,match_date,kickoff_time,"
-            + "home_team,away_team,studium"
+            + ",".join(ScheduleBatch.COLUMNS)
             + " "
             + "FROM"
             + " "
@@ -252,8 +902,90 @@ class ScheduleService:
             + "ORDER BY kickoff_time DESC;",
             search_values,
         )
-        return self._get_objects()
+        schedules = ScheduleBatch()
+        schedules.extend_rows(rows)
+        return schedules
+
+    @cached_query
+    def get_page_data(
+        self,
+        team_name: str = None,
+        category: str = None,
+        match_date: date = None,
+    ) -> dict:
+        """Webページの表示に必要なデータを1回のクエリでまとめて返す。
+
+        find、get_all_teams、get_all_categories、get_last_updatedの結果を
+        CTEで組み合わせ、データベースとの通信を1往復で済ませる。
 
+        Args:
+            team_name(str, optional): 対象のチーム名。デフォルトはNone。
+            category(str, optional): 対象のカテゴリ名。デフォルトはNone。
+            match_date(:obj:`datetime.date`, optional): 基準の日時。デフォルトはNone。
+
+        Returns:
+            page_data (dict): 検索結果のScheduleBatch(schedules)、チーム名のリスト(teams)、
+                カテゴリ名のリスト(categories)、最終更新日(last_updated)の辞書。
+
+        """
+        search_condition, search_values = self._get_search_condition(
+            team_name, category, match_date
+        )
+        columns = ",".join(ScheduleBatch.COLUMNS)
+        # チーム名やカテゴリ名は検索結果の先頭行にだけ付与して転送量を抑える。
+        rows = self._fetch_rows(
+            "WITH found AS ("
+            + "SELECT "
+            + columns
+            + ","
+            + "row_number() OVER (ORDER BY kickoff_time DESC) AS row_number"
+            + " "
+            + "FROM "
+            + self.__table_name
+            + " "
+            + search_condition
+            + "), "
+            + "summary AS ("
+            + "SELECT "
+            + "ARRAY(SELECT name FROM teams ORDER BY sort_order) AS teams, "
+            + "ARRAY(SELECT category FROM "
+            + self.__table_name
+            + " "
+            + "WHERE category <> '' GROUP BY category"
+            + " "
+            + 'ORDER BY category COLLATE "C") AS categories, '
+            + "(SELECT max(updated_at) FROM "
+            + self.__table_name
+            + ") AS last_updated"
+            + ") "
+            + "SELECT "
+            + "CASE WHEN coalesce(found.row_number, 1) = 1"
+            + " "
+            + "THEN summary.teams END AS teams, "
+            + "CASE WHEN coalesce(found.row_number, 1) = 1"
+            + " "
+            + "THEN summary.categories END AS categories, "
+            + "summary.last_updated, "
+            + ",".join("found." + column for column in ScheduleBatch.COLUMNS)
+            + " "
+            + "FROM summary LEFT JOIN found ON TRUE "
+            + "ORDER BY found.row_number;",
+            search_values,
+        )
+        # 先頭の3列がチーム名、カテゴリ名、最終更新日で、残りが試合スケジュールの列。
+        # 検索結果がない場合も、試合スケジュールの列がNULLの行が1行返る。
+        teams, categories, last_updated = rows[0][:3]
+        schedules = ScheduleBatch()
+        schedules.extend_rows(row[3:] for row in rows if row[3] is not None)
+        page_data = {
+            "schedules": schedules,
+            "teams": teams,
+            "categories": categories,
+            "last_updated": last_updated,
+        }
+        return page_data
+
+    @cached_query
     def get_all_teams(self) -> list:
         """試合スケジュールのある全てのチーム名を返す。
 
@@ -262,18 +994,45 @@ class ScheduleService:
 
         """
         team_names = list()
-        self._execute("SELECT home_team FROM " + self.__table_name + ";")
-        home_team_rows = self._fetchall()
-        self._execute("SELECT away_team FROM " + self.__table_name + ";")
-        away_team_rows = self._fetchall()
-        for row in home_team_rows:
-            team_names.append(row["home_team"])
-        for row in away_team_rows:
-            team_names.append(row["away_team"])
-
-        team_names = list(filter(lambda a: a != "", team_names))
-        return sorted(set(team_names), key=team_names.index)
+        self._execute("SELECT name FROM teams ORDER BY sort_order;")
+        for row in self._fetchall():
+            team_names.append(row["name"])
+        return team_names
+
+    def refresh_teams(self) -> None:
+        """試合スケジュールテーブルからチーム名の一覧を作り直す。
+
+        ホームチームとして登場した順、次にアウェイチームとして登場した順に
+        並べたチーム名を、整形したチーム名とともにteamsテーブルに保存する。
+        試合スケジュールを登録・更新した後に呼び出す。
+
+        """
+        # TRUNCATEは閲覧中のリクエストをブロックするためDELETEで削除する。
+        self._execute("DELETE FROM teams;")
+        self._execute(
+            "INSERT INTO teams (name,normalized_name,sort_order)"
+            + " "
+            + "SELECT team_name, min(normalized_name),"
+            + " "
+            + "row_number() OVER (ORDER BY min(position))"
+            + " "
+            + "FROM ("
+            + "SELECT home_team AS team_name,"
+            + " "
+            + "home_team_normalized AS normalized_name, ARRAY[0, id] AS position FROM "
+            + self.__table_name
+            + " "
+            + "UNION ALL "
+            + "SELECT away_team, away_team_normalized, ARRAY[1, id] FROM "
+            + self.__table_name
+            + ") AS team_names"
+            + " "
+            + "WHERE team_name <> ''"
+            + " "
+            + "GROUP BY team_name;"
+        )
 
+    @cached_query
     def get_all_categories(self) -> list:
         """全てのカテゴリ名を返す。
 
@@ -288,6 +1047,7 @@ class ScheduleService:
         categories = list(filter(lambda a: a != "", categories))
         return sorted(set(categories))
 
+    @cached_query
     def get_last_updated(self) -> Optional[datetime]:
         """テーブルの最終更新日を返す。
 
@@ -300,3 +1060,101 @@ class ScheduleService:
             return None
         else:
             return row["max"]
+
+
+class ScheduleChangeListener:
+    """試合スケジュールの更新通知を受け取り、キャッシュを破棄する。
+
+    専用のコネクションでPostgreSQLのLISTENを実行するスレッドを起動し、
+    取り込み処理がコミットしたNOTIFYを受け取ると、登録されたキャッシュに
+    最新のデータのバージョンを設定する。接続が切れた場合はキャッシュの
+    バージョンを不明にしてから再接続する。
+
+    Attributes:
+        caches (list): set_versionメソッドを持つキャッシュのリスト
+
+    """
+
+    def __init__(
+        self, caches: list, reconnect_interval: float = 5, timeout: float = 60
+    ):
+        """
+        Args:
+            caches (list): set_versionメソッドを持つキャッシュのリスト
+            reconnect_interval (float, optional): 再接続までの待ち時間（秒）
+            timeout (float, optional): 通知を待つ間に接続を確認する間隔（秒）
+
+        """
+        self.__caches = caches
+        self.__reconnect_interval = reconnect_interval
+        self.__timeout = timeout
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__pid = None
+        self.__logger = AppLog()
+
+    @property
+    def caches(self) -> list:
+        return self.__caches
+
+    def start(self) -> None:
+        """通知を受け取るスレッドを起動する。
+
+        プロセスごとに1回だけ起動し、起動済みであれば何もしない。
+
+        """
+        with self.__lock:
+            if self.__pid == os.getpid() and self.__thread.is_alive():
+                return
+            self.__pid = os.getpid()
+            self.__thread = threading.Thread(target=self._run, daemon=True)
+            self.__thread.start()
+
+    def _set_version(self, version: Optional[int]) -> None:
+        """登録されたキャッシュにデータのバージョンを設定する。
+
+        Args:
+            version (int): データのバージョン。不明な場合はNone。
+
+        """
+        for cache in self.__caches:
+            cache.set_version(version)
+
+    def _listen(self, db: DB, conn) -> None:
+        """通知を待ち受ける。接続が切れるまで戻らない。
+
+        Args:
+            db (:obj:`DB`): 通知を受け取るコネクションをラップしたオブジェクト
+            conn (:obj:`psycopg2.extensions.connection`): 通知を受け取るコネクション
+
+        """
+        service = ScheduleService(db)
+        cursor = db.cursor()
+        cursor.execute("LISTEN " + Config.NOTIFY_CHANNEL + ";")
+        self._set_version(service.get_data_version())
+        while True:
+            if select.select([conn], [], [], self.__timeout) == ([], [], []):
+                # 通知がない間も接続が切れていないか確認する。
+                cursor.execute("SELECT 1;")
+                continue
+            conn.poll()
+            if conn.notifies:
+                conn.notifies.clear()
+                # 通知の順序に依存しないよう、最新のバージョンを取得し直す。
+                self._set_version(service.get_data_version())
+
+    def _run(self) -> None:
+        """接続が切れても再接続しながら通知を待ち受ける。"""
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(Config.DATABASE_URL)
+                conn.autocommit = True
+                self._listen(DB(conn=conn), conn)
+            except (psycopg2.Error, DataError, OSError) as e:
+                self.__logger.warning("更新通知を受け取れません: " + str(e))
+            finally:
+                self._set_version(None)
+                if conn is not None and not conn.closed:
+                    conn.close()
+            time.sleep(self.__reconnect_interval)
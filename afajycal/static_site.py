@@ -0,0 +1,136 @@
+import gzip
+import os
+import shutil
+import urllib.parse
+from datetime import datetime
+from typing import Optional
+
+from flask import escape
+
+from afajycal.config import Config
+from afajycal.db import DB
+from afajycal.files import make_build_dir, publish_dir
+from afajycal.logs import AppLog
+from afajycal.services import ScheduleService
+from afajycal.views import (
+    app,
+    render_find,
+    render_index,
+    render_not_found,
+)
+
+
+class StaticSite:
+    """静的Webサイトの生成
+
+    トップページ、チーム・カテゴリごとの検索結果ページ、404エラーページを
+    描画してディレクトリに保存する。gunicornやリバースプロキシから
+    データベースに問い合わせずに配信できるよう、gzip圧縮したファイルも保存する。
+
+    生成するファイルは次のとおり。チーム名・カテゴリ名はURLエンコードする。
+
+        index.html
+        404.html
+        find/index.html                      （全チーム・全カテゴリ）
+        find/team/{チーム名}.html
+        find/category/{カテゴリ名}.html
+
+    Webアプリケーションのコネクションプールは使わず、指定されたDBオブジェクト、
+    または生成のたびに接続したDBオブジェクトで検索する。
+
+    Attributes:
+        output_dir (str): 静的ファイルを保存するディレクトリ
+
+    """
+
+    def __init__(self, output_dir: str, db: Optional[DB] = None):
+        """
+        Args:
+            output_dir (str): 静的ファイルを保存するディレクトリ
+            db (:obj:`DB`, optional): 検索に使うDBオブジェクト。省略した場合は
+                buildのたびに接続し、終了時に切断する。
+
+        """
+        self.__output_dir = os.path.abspath(output_dir)
+        self.__db = db
+        self.__logger = AppLog()
+
+    @property
+    def output_dir(self) -> str:
+        return self.__output_dir
+
+    @staticmethod
+    def _write_page(path: str, page: str) -> None:
+        """ページとgzip圧縮したページを保存する。
+
+        Args:
+            path (str): 保存先のパス
+            page (str): 描画したページ
+
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = page.encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(data)
+        # 内容が同じなら同じファイルになるよう、圧縮時刻は記録しない。
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        """ファイル名に使えるようチーム名・カテゴリ名をURLエンコードする。
+
+        Args:
+            name (str): チーム名・カテゴリ名
+
+        Returns:
+            quoted_name (str): URLエンコードした名前
+
+        """
+        return urllib.parse.quote(name, safe="")
+
+    def build(self) -> int:
+        """全てのページを描画して保存する。
+
+        作業用ディレクトリに全てのページを保存してからpublish_dirで切り替えるため、
+        配信中に生成途中のファイルが見えたり、ページが見つからなくなったりすることはない。
+
+        Returns:
+            count (int): 保存したページの数。
+
+        """
+        db = self.__db if self.__db is not None else DB()
+        build_dir = make_build_dir(self.__output_dir)
+        count = 0
+        try:
+            with app.test_request_context():
+                schedule_service = ScheduleService(db)
+                pages = [
+                    (
+                        "index.html",
+                        render_index(schedule_service, datetime.now(Config.JST)),
+                    ),
+                    ("404.html", render_not_found(schedule_service)),
+                    ("find/index.html", render_find(schedule_service, None, None)),
+                ]
+                for team_name in schedule_service.get_all_teams():
+                    path = "find/team/" + self._quote(team_name) + ".html"
+                    page = render_find(schedule_service, escape(team_name), None)
+                    pages.append((path, page))
+                for category in schedule_service.get_all_categories():
+                    path = "find/category/" + self._quote(category) + ".html"
+                    page = render_find(schedule_service, None, escape(category))
+                    pages.append((path, page))
+                for path, page in pages:
+                    self._write_page(os.path.join(build_dir, path), page)
+                    count += 1
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        finally:
+            if self.__db is None:
+                db.close()
+
+        publish_dir(build_dir, self.__output_dir)
+        self.__logger.info(str(count) + "件の静的ページを生成しました。")
+        return count
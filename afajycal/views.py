@@ -1,13 +1,45 @@
-from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
 
-from flask import Flask, escape, g, render_template, request
+from flask import (
+    Flask,
+    Response,
+    escape,
+    g,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    send_from_directory,
+    stream_with_context,
+    url_for,
+)
+from werkzeug.exceptions import NotFound
+from werkzeug.http import is_resource_modified
 
+from afajycal.cache import PageCache, QueryCache
 from afajycal.config import Config
-from afajycal.db import DB
-from afajycal.services import ScheduleService
+from afajycal.db import DBPool
+from afajycal.ical import CalendarFeeds
+from afajycal.services import ScheduleChangeListener, ScheduleService
 
 app = Flask(__name__)
 THIS_YEAR = Config.THIS_YEAR
+db_pool = DBPool()
+query_cache = QueryCache(Config.QUERY_CACHE_SIZE, Config.QUERY_CACHE_TTL)
+page_cache = PageCache(
+    Config.PAGE_CACHE_SIZE, Config.QUERY_CACHE_TTL, Config.PAGE_CACHE_DIR
+)
+change_listener = ScheduleChangeListener([query_cache, page_cache])
+
+
+@app.before_request
+def start_change_listener():
+    # ワーカープロセスごとに、取り込み処理からの更新通知の待ち受けを開始する。
+    if Config.LISTEN_CHANGES:
+        change_listener.start()
 
 
 @app.after_request
@@ -25,7 +57,7 @@ def add_security_headers(response):
 
 
 def connect_db():
-    return DB()
+    return db_pool.connect()
 
 
 def get_db():
@@ -37,29 +69,85 @@ def get_db():
 @app.teardown_appcontext
 def close_db(error):
     if hasattr(g, "postgres_db"):
+        # プールから取得したコネクションを返却する。
         g.postgres_db.close()
 
 
+def make_validators(schedule_service, *args):
+    """条件付きリクエストに使うETagとLast-Modifiedの値を作成する。
+
+    データのバージョンとバージョンを更新した日時、ページを表示する条件から
+    作成するため、試合スケジュールを取り込むまで同じ値になる。試合の削除だけでも
+    バージョンは更新されるため、Last-Modifiedだけで再検証するクライアントにも
+    古いページを返さない。
+
+    Args:
+        schedule_service (:obj:`ScheduleService`): 試合スケジュールデータを扱う
+            オブジェクト。
+        args: ページの表示内容を決める条件。
+
+    Returns:
+        validators (tuple): ETagとLast-Modifiedの値のタプル。
+
+    """
+    last_modified = schedule_service.get_version_updated_at()
+    values = [str(schedule_service.get_current_version()), str(last_modified)]
+    values += [str(arg) for arg in args]
+    etag = hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+    return (etag, last_modified)
+
+
+def not_modified_response(etag, last_modified):
+    """ブラウザのキャッシュが最新であれば304レスポンスを返す。
+
+    Args:
+        etag (str): ETagの値。
+        last_modified (:obj:`datetime.datetime`): Last-Modifiedの値。
+
+    Returns:
+        response (:obj:`flask.Response`): 304レスポンス。ブラウザのキャッシュが
+            古い場合はNone。
+
+    """
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    response = make_response("", 304)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """レスポンスにETagとLast-Modifiedを設定し、毎回の再検証を求める。
+
+    Args:
+        response (:obj:`flask.Response`): レスポンス。
+        etag (str): ETagの値。
+        last_modified (:obj:`datetime.datetime`): Last-Modifiedの値。
+
+    """
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"
+
+
 @app.route("/")
 def index():
     JST = Config.JST
     date_now = datetime.now(JST)
-    schedule_service = ScheduleService(get_db())
-    today_schedules = schedule_service.find(match_date=date_now.date())
-    all_teams = schedule_service.get_all_teams()
-    all_categories = [""] + schedule_service.get_all_categories()
-    title = "AFA Junior Youth Calendar"
-    return render_template(
-        "index.html",
-        title=title,
-        this_year=THIS_YEAR,
-        teams=all_teams,
-        categories=all_categories,
-        date_now=date_now.date().strftime("%Y-%m-%d %a"),
-        schedules=today_schedules,
-        results_number=len(today_schedules),
-        last_update=schedule_service.get_last_updated().strftime("%Y/%m/%d %H:%M"),
-    )
+    schedule_service = ScheduleService(get_db(), cache=query_cache)
+    # 今日の試合日程を表示するため、日付が変わったらLast-Modifiedも更新する。
+    etag, last_modified = make_validators(schedule_service, "index", date_now.date())
+    start_of_today = datetime(date_now.year, date_now.month, date_now.day, tzinfo=JST)
+    if last_modified is None or last_modified < start_of_today:
+        last_modified = start_of_today
+    response = not_modified_response(etag, last_modified)
+    if response is not None:
+        return response
+
+    response = make_response(render_index(schedule_service, date_now))
+    set_validators(response, etag, last_modified)
+    return response
 
 
 @app.route("/find")
@@ -75,10 +163,71 @@ def find():
     else:
         category = escape(category)
 
-    schedule_service = ScheduleService(get_db())
-    found_schedules = schedule_service.find(team_name=team_name, category=category)
-    all_teams = schedule_service.get_all_teams()
-    all_categories = [""] + schedule_service.get_all_categories()
+    schedule_service = ScheduleService(get_db(), cache=query_cache)
+    etag, last_modified = make_validators(schedule_service, "find", team_name, category)
+    response = not_modified_response(etag, last_modified)
+    if response is not None:
+        return response
+
+    # 描画済みのページはデータのバージョンが変わるまで再利用する。
+    key = tuple(None if arg is None else str(arg) for arg in (team_name, category))
+    page = page_cache.get_or_load(
+        key,
+        schedule_service.get_current_version(),
+        lambda: render_find(schedule_service, team_name, category),
+    )
+    response = make_response(page)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def render_index(schedule_service, date_now):
+    """今日の試合スケジュールを表示するトップページを描画する。
+
+    Args:
+        schedule_service (:obj:`ScheduleService`): 試合スケジュールデータを扱う
+            オブジェクト。
+        date_now (:obj:`datetime.datetime`): 現在日時。
+
+    Returns:
+        page (str): 描画したページ。
+
+    """
+    page_data = schedule_service.get_page_data(match_date=date_now.date())
+    today_schedules = page_data["schedules"]
+    all_teams = page_data["teams"]
+    all_categories = [""] + page_data["categories"]
+    title = "AFA Junior Youth Calendar"
+    return render_template(
+        "index.html",
+        title=title,
+        this_year=THIS_YEAR,
+        teams=all_teams,
+        categories=all_categories,
+        date_now=date_now.date().strftime("%Y-%m-%d %a"),
+        schedules=today_schedules,
+        results_number=len(today_schedules),
+        last_update=page_data["last_updated"].strftime("%Y/%m/%d %H:%M"),
+    )
+
+
+def render_find(schedule_service, team_name, category):
+    """試合スケジュールの検索結果ページを描画する。
+
+    Args:
+        schedule_service (:obj:`ScheduleService`): 試合スケジュールデータを扱う
+            オブジェクト。
+        team_name (str): 対象のチーム名。指定しない場合はNone。
+        category (str): 対象のカテゴリ名。指定しない場合はNone。
+
+    Returns:
+        page (str): 描画したページ。
+
+    """
+    page_data = schedule_service.get_page_data(team_name=team_name, category=category)
+    found_schedules = page_data["schedules"]
+    all_teams = page_data["teams"]
+    all_categories = [""] + page_data["categories"]
     if team_name is None:
         team_name = "全チーム"
     if category is None:
@@ -97,13 +246,184 @@ def find():
         category=category,
         schedules=found_schedules,
         results_number=len(found_schedules),
-        last_update=schedule_service.get_last_updated().strftime("%Y/%m/%d %H:%M"),
+        last_update=page_data["last_updated"].strftime("%Y/%m/%d %H:%M"),
     )
 
 
+def parse_api_args(args):
+    """APIのクエリ文字列を検索条件に変換する。
+
+    Args:
+        args (:obj:`werkzeug.datastructures.MultiDict`): クエリ文字列。
+
+    Returns:
+        conditions (dict): ScheduleService.iter_schedulesに渡す検索条件。
+
+    Raises:
+        ValueError: 値の形式が正しくない場合。
+
+    """
+    conditions = dict()
+    for name in ("team_name", "category"):
+        value = args.get(name, "")
+        conditions[name] = None if value == "" else value
+    for name in ("date_from", "date_to"):
+        value = args.get(name, "")
+        if value == "":
+            conditions[name] = None
+        else:
+            try:
+                conditions[name] = date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(name + "はYYYY-MM-DD形式で指定してください。")
+    after = args.get("after", "")
+    if after == "":
+        conditions["after"] = None
+    else:
+        # 前回の最後の行のキックオフ日時と連番を「,」で区切って指定する。
+        kickoff_time, _, serial_number = after.rpartition(",")
+        try:
+            kickoff_time = datetime.fromisoformat(kickoff_time)
+        except ValueError:
+            raise ValueError("afterの形式が正しくありません。")
+        if kickoff_time.tzinfo is None or serial_number == "":
+            raise ValueError("afterの形式が正しくありません。")
+        conditions["after"] = (kickoff_time, serial_number)
+    try:
+        limit = int(args.get("limit", Config.API_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limitは整数で指定してください。")
+    if limit < 1 or Config.API_MAX_PAGE_SIZE < limit:
+        raise ValueError(
+            "limitは1から"
+            + str(Config.API_MAX_PAGE_SIZE)
+            + "の範囲で指定してください。"
+        )
+    conditions["limit"] = limit
+    return conditions
+
+
+def schedule_to_dict(row):
+    """試合スケジュールの行をJSONに変換できる辞書にする。
+
+    Args:
+        row (:obj:`DictRow`): 試合スケジュールの行。
+
+    Returns:
+        schedule (dict): 試合スケジュールの辞書。
+
+    """
+    return {
+        "serial_number": row["serial_number"],
+        "category": row["category"],
+        "match_number": row["match_number"],
+        "match_date": row["match_date"].isoformat(),
+        "kickoff_time": row["kickoff_time"].astimezone(Config.JST).isoformat(),
+        "home_team": row["home_team"],
+        "away_team": row["away_team"],
+        "studium": row["studium"],
+    }
+
+
+@app.route("/api/schedules")
+def api_schedules():
+    try:
+        conditions = parse_api_args(request.args)
+    except ValueError as e:
+        return make_response(jsonify({"error": e.args[0]}), 400)
+
+    schedule_service = ScheduleService(get_db(), cache=query_cache)
+    etag, last_modified = make_validators(
+        schedule_service, "api", *[conditions[key] for key in sorted(conditions)]
+    )
+    response = not_modified_response(etag, last_modified)
+    if response is not None:
+        return response
+
+    def generate():
+        # 一覧を作らず、サーバサイドカーソルから読み込んだ行を順に送信する。
+        yield '{"schedules":['
+        count = 0
+        last_row = None
+        for row in schedule_service.iter_schedules(**conditions):
+            if count:
+                yield ","
+            yield json.dumps(schedule_to_dict(row), ensure_ascii=False)
+            count += 1
+            last_row = row
+        next_url = None
+        if count == conditions["limit"]:
+            args = request.args.to_dict()
+            args["after"] = (
+                last_row["kickoff_time"].astimezone(Config.JST).isoformat()
+                + ","
+                + last_row["serial_number"]
+            )
+            next_url = url_for("api_schedules", **args)
+        yield '],"next":' + json.dumps(next_url) + "}"
+
+    response = Response(stream_with_context(generate()), mimetype="application/json")
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def send_calendar(kind, name):
+    """取り込み時に生成したiCalendar形式のカレンダーを返す。
+
+    データベースには問い合わせず、ファイルの更新日時と大きさから作った
+    ETagとLast-Modifiedで条件付きリクエストに応答する。生成されていない
+    カレンダーの場合も、404エラーページを描画せずに本文だけの404を返す。
+
+    Args:
+        kind (str): teamまたはcategory。
+        name (str): チーム名・カテゴリ名。
+
+    Returns:
+        response (:obj:`flask.Response`): カレンダーのレスポンス。
+
+    """
+    not_found_response = Response("Not Found", 404, mimetype="text/plain")
+    if not Config.CALENDAR_DIR:
+        return not_found_response
+    try:
+        response = send_from_directory(
+            os.path.abspath(Config.CALENDAR_DIR),
+            CalendarFeeds.get_filename(kind, name),
+            mimetype="text/calendar",
+        )
+    except NotFound:
+        return not_found_response
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/calendar/<team_name>.ics")
+def team_calendar(team_name):
+    return send_calendar("team", team_name)
+
+
+@app.route("/calendar/category/<category>.ics")
+def category_calendar(category):
+    return send_calendar("category", category)
+
+
 @app.errorhandler(404)
 def not_found(error):
-    schedule_service = ScheduleService(get_db())
+    schedule_service = ScheduleService(get_db(), cache=query_cache)
+    return render_not_found(schedule_service)
+
+
+def render_not_found(schedule_service):
+    """404エラーページを描画する。
+
+    Args:
+        schedule_service (:obj:`ScheduleService`): 試合スケジュールデータを扱う
+            オブジェクト。
+
+    Returns:
+        page (str): 描画したページ。
+
+    """
     all_teams = schedule_service.get_all_teams()
     all_categories = [""] + schedule_service.get_all_categories()
     title = "404 Page Not Found."
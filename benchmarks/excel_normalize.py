@@ -0,0 +1,131 @@
+"""Excelの試合スケジュールを1行ずつ変換する場合とpandasでまとめて変換する場合の比較
+
+$ python benchmarks/excel_normalize.py --rows 10000
+
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import time as datetime_time
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from afajycal.scraper import DownloadedExcel, ScrapedExcelData  # noqa: E402
+
+HEADER = [
+    None,
+    "M.No.",
+    "節",
+    "月",
+    "日",
+    "C",
+    "G",
+    "会場",
+    "KO",
+    "HOME",
+    None,
+    "AWAY",
+    "順番",
+]
+TEAMS = ["六　合", "留　萌", "永山南", "中富良野", "TRAUM2nd", "東　光"]
+STUDIUMS = ["東光スポーツ公園A", "花咲球技場", "忠和公園"]
+CATEGORIES = ["D1", "D2", "サテライト", "U-13"]
+# 変換の規則を確認するため、範囲外の値や空のセルも混ぜる。
+MONTHS = list(range(1, 13)) + ["13", "", "x"]
+DAYS = list(range(1, 29)) + ["0", "x"]
+KICKOFFS = [datetime_time(h, m) for h in range(9, 18) for m in (0, 30)] + [
+    "9:5",
+    "",
+    None,
+]
+
+
+def make_workbook(path: str, rows: int) -> None:
+    """試合スケジュールのExcelファイルを作成する。
+
+    Args:
+        path (str): 保存先のパス
+        rows (int): 試合スケジュールの行数
+
+    """
+    random.seed(0)
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet("日程順")
+    worksheet.append(HEADER)
+    for number in range(rows):
+        month = random.choice(MONTHS)
+        day = random.choice(DAYS)
+        worksheet.append(
+            [
+                "M" + str(number) if number % 50 else None,
+                "AC" + str(number),
+                number % 20,
+                month,
+                day,
+                random.choice(CATEGORIES),
+                "B",
+                random.choice(STUDIUMS),
+                random.choice(KICKOFFS),
+                random.choice(TEAMS),
+                "vs",
+                random.choice(TEAMS),
+                float(number),
+            ]
+        )
+    workbook.save(path)
+
+
+class Rows:
+    """読み込み済みの行を返し、変換だけの時間を測る。"""
+
+    def __init__(self, lists: list):
+        self.lists = lists
+
+    def iter_rows(self):
+        return iter(self.lists)
+
+
+def measure(scraped_data: ScrapedExcelData, repeat: int) -> tuple:
+    """変換にかかった最短の時間と結果を返す。"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = list(scraped_data.iter_schedule_data())
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return (best, result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="試合スケジュールの行数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測する回数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "nittei.xlsx")
+        make_workbook(path, args.rows)
+        start = time.perf_counter()
+        lists = DownloadedExcel(path).lists
+        print("read rows:       {:8.3f} s".format(time.perf_counter() - start))
+
+    rows = Rows(lists)
+    per_row, expect = measure(ScrapedExcelData(rows, vectorized=False), args.repeat)
+    vectorized, result = measure(ScrapedExcelData(rows, vectorized=True), args.repeat)
+    if result != expect:
+        raise SystemExit("results differ")
+    print("schedules:       {:8d}".format(len(result)))
+    print("per-row:         {:8.3f} s".format(per_row))
+    print("vectorized:      {:8.3f} s".format(vectorized))
+    print("speedup:         {:8.2f} x".format(per_row / vectorized))
+
+
+if __name__ == "__main__":
+    main()
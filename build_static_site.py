@@ -0,0 +1,26 @@
+from afajycal.config import Config
+from afajycal.errors import DatabaseError, DataError
+from afajycal.logs import AppLog
+from afajycal.static_site import StaticSite
+
+
+def build_static_site():
+    """静的ページを生成する
+
+    トップページには当日の試合スケジュールを表示するため、
+    日付が変わった直後にも実行する。
+
+    """
+
+    logger = AppLog()
+    if not Config.STATIC_DIR:
+        logger.warning("AFAJYCAL_STATIC_DIRが設定されていないため処理を終了します。")
+        return
+    try:
+        StaticSite(Config.STATIC_DIR).build()
+    except (DatabaseError, DataError, OSError) as e:
+        logger.error("静的ページを生成できませんでした。" + str(e))
+
+
+if __name__ == "__main__":
+    build_static_site()
@@ -0,0 +1,6 @@
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS row_digest VARCHAR(64);
+CREATE TABLE IF NOT EXISTS sources(
+  url VARCHAR(256) PRIMARY KEY NOT NULL,
+  digest VARCHAR(64) NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL
+);
@@ -0,0 +1,16 @@
+CREATE TABLE IF NOT EXISTS teams(
+  id SERIAL PRIMARY KEY NOT NULL,
+  name VARCHAR(32) UNIQUE NOT NULL,
+  sort_order INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS teams_sort_order_idx ON teams (sort_order) INCLUDE (name);
+DELETE FROM teams;
+INSERT INTO teams (name, sort_order)
+SELECT team_name, row_number() OVER (ORDER BY min(position))
+FROM (
+  SELECT home_team AS team_name, ARRAY[0, id] AS position FROM schedules
+  UNION ALL
+  SELECT away_team, ARRAY[1, id] FROM schedules
+) AS team_names
+WHERE team_name <> ''
+GROUP BY team_name;
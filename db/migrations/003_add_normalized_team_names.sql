@@ -0,0 +1,14 @@
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS home_team_normalized VARCHAR(32);
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS away_team_normalized VARCHAR(32);
+UPDATE schedules SET
+  home_team_normalized = btrim(regexp_replace(
+    regexp_replace(btrim(home_team), '^旭川市立', ''), '(中学校|学校|中)$', ''
+  )),
+  away_team_normalized = btrim(regexp_replace(
+    regexp_replace(btrim(away_team), '^旭川市立', ''), '(中学校|学校|中)$', ''
+  ));
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS schedules_home_team_normalized_trgm_idx
+  ON schedules USING gin (home_team_normalized gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS schedules_away_team_normalized_trgm_idx
+  ON schedules USING gin (away_team_normalized gin_trgm_ops);
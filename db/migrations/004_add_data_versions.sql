@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS data_versions(
+  name VARCHAR(32) PRIMARY KEY NOT NULL,
+  version INTEGER NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL
+);
@@ -0,0 +1,2 @@
+CREATE INDEX IF NOT EXISTS schedules_kickoff_time_serial_number_idx
+  ON schedules (kickoff_time, serial_number);
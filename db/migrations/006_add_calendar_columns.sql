@@ -0,0 +1,8 @@
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS end_time TIMESTAMPTZ;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS google_calendar_link TEXT;
+UPDATE schedules SET
+  end_time = kickoff_time + CASE WHEN category = 'サテライト'
+    THEN interval '60 minutes' ELSE interval '90 minutes' END,
+  row_digest = NULL;
+-- Googleカレンダーのリンクは次回の取り込みで保存するため、取り込み済みの記録を消す。
+DELETE FROM sources;
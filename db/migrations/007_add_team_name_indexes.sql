@@ -0,0 +1,9 @@
+CREATE INDEX IF NOT EXISTS schedules_home_team_normalized_idx
+  ON schedules (home_team_normalized);
+CREATE INDEX IF NOT EXISTS schedules_away_team_normalized_idx
+  ON schedules (away_team_normalized);
+ALTER TABLE teams ADD COLUMN IF NOT EXISTS normalized_name VARCHAR(32);
+UPDATE teams SET
+  normalized_name = btrim(regexp_replace(
+    regexp_replace(btrim(name), '^旭川市立', ''), '(中学校|学校|中)$', ''
+  ));
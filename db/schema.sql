@@ -9,5 +9,41 @@ CREATE TABLE schedules(
   home_team VARCHAR(32),
   away_team VARCHAR(32),
   studium VARCHAR(32),
+  end_time TIMESTAMPTZ,
+  google_calendar_link TEXT,
+  home_team_normalized VARCHAR(32),
+  away_team_normalized VARCHAR(32),
+  row_digest VARCHAR(64),
+  updated_at TIMESTAMPTZ NOT NULL
+);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX schedules_home_team_normalized_trgm_idx
+  ON schedules USING gin (home_team_normalized gin_trgm_ops);
+CREATE INDEX schedules_away_team_normalized_trgm_idx
+  ON schedules USING gin (away_team_normalized gin_trgm_ops);
+CREATE INDEX schedules_home_team_normalized_idx
+  ON schedules (home_team_normalized);
+CREATE INDEX schedules_away_team_normalized_idx
+  ON schedules (away_team_normalized);
+CREATE INDEX schedules_kickoff_time_serial_number_idx
+  ON schedules (kickoff_time, serial_number);
+DROP TABLE IF EXISTS sources;
+CREATE TABLE sources(
+  url VARCHAR(256) PRIMARY KEY NOT NULL,
+  digest VARCHAR(64) NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL
+);
+DROP TABLE IF EXISTS teams;
+CREATE TABLE teams(
+  id SERIAL PRIMARY KEY NOT NULL,
+  name VARCHAR(32) UNIQUE NOT NULL,
+  normalized_name VARCHAR(32),
+  sort_order INTEGER NOT NULL
+);
+CREATE INDEX teams_sort_order_idx ON teams (sort_order) INCLUDE (name);
+DROP TABLE IF EXISTS data_versions;
+CREATE TABLE data_versions(
+  name VARCHAR(32) PRIMARY KEY NOT NULL,
+  version INTEGER NOT NULL,
   updated_at TIMESTAMPTZ NOT NULL
 );
@@ -1,35 +1,114 @@
+import argparse
+import itertools
+
+from afajycal.cache import DownloadCache
+from afajycal.config import Config
 from afajycal.db import DB
 from afajycal.errors import DatabaseError, DataError
+from afajycal.fetcher import Fetcher, load_sources
+from afajycal.ical import CalendarFeeds
 from afajycal.logs import AppLog
-from afajycal.models import ScheduleFactory
+from afajycal.models import Schedule
 from afajycal.services import ScheduleService
-from afajycal.scraper import DownloadedHTML, ScrapedHTMLData
+from afajycal.static_site import StaticSite
 
 
-def import_schedules():
-    """データベースに試合スケジュールを格納"""
+def import_schedules(rebuild: bool = False):
+    """データベースに試合スケジュールを格納
 
-    # Webサイトからデータを抽出する処理
-    downloaded_html = DownloadedHTML("http://afa11.com/asahijy/reiwa2/nittei2020.html")
-    scraped_data = ScrapedHTMLData(downloaded_html)
-    schedule_factory = ScheduleFactory()
-    for row in scraped_data.schedule_data:
-        schedule_factory.create(**row)
+    Args:
+        rebuild (bool, optional): Trueの場合は差分ではなく、作業用テーブルに
+            全データを登録してから試合スケジュールテーブルと入れ替える。
+
+    """
 
-    # 抽出データをデータベースへ格納する処理
-    db = DB()
     logger = AppLog()
+    if Config.CACHE_DIR:
+        cache = DownloadCache(Config.CACHE_DIR)
+    else:
+        cache = None
+    try:
+        sources = load_sources(Config.SOURCES)
+    except ValueError as e:
+        logger.error("取得元の設定を読み込めませんでした。" + str(e))
+        return
+    # 全ての取得元を並行してダウンロードする。
+    fetcher = Fetcher(cache=cache)
+    try:
+        downloaded_data = fetcher.fetch(sources)
+    finally:
+        fetcher.close()
+
+    db = DB()
     try:
         schedule_service = ScheduleService(db)
-        for schedule in schedule_factory.items:
-            schedule_service.create(schedule)
+        # 取得元の組み合わせと全ての取得元の内容が前回取り込んだときと同じであれば、
+        # 抽出もデータベースの更新も行わない。取得元を減らした場合は、その取得元の
+        # 試合を削除するため更新する。
+        saved_digests = schedule_service.get_source_digests()
+        digests = {
+            source.url: data.digest for source, data in zip(sources, downloaded_data)
+        }
+        is_modified = saved_digests != digests
+        if not rebuild and not is_modified:
+            logger.info("試合スケジュールが更新されていないため処理を終了します。")
+            return
+
+        # Webサイトからデータを抽出する処理。1行ずつ抽出して変換し、
+        # データベースへはまとめて登録するため全件を保持しない。
+        # 差分の反映では渡されなかった試合を削除するため、全ての取得元をまとめて渡す。
+        schedules = (
+            Schedule(**row)
+            for source, data in zip(sources, downloaded_data)
+            for row in source.scrape(data).iter_schedule_data()
+        )
+
+        # 抽出できなかった場合に登録済みのデータを全て削除しないようにする。
+        first_schedule = next(schedules, None)
+        if first_schedule is None:
+            logger.warning("試合スケジュールを抽出できなかったため処理を終了します。")
+            return
+        schedules = itertools.chain([first_schedule], schedules)
+
+        if rebuild:
+            schedule_service.rebuild(schedules)
+        else:
+            # 抽出データとの差分だけをデータベースへ反映する処理
+            schedule_service.sync(schedules)
+        for url, digest in digests.items():
+            schedule_service.save_source_digest(url, digest)
+        schedule_service.delete_source_digests(
+            [url for url in saved_digests if url not in digests]
+        )
         db.commit()
+
+        # 購読用のカレンダーは取り込み時に生成し、配信時にはデータベースに問い合わせない。
+        if Config.CALENDAR_DIR:
+            try:
+                CalendarFeeds(Config.CALENDAR_DIR).build(schedule_service.find())
+            except OSError as e:
+                logger.error("カレンダーを生成できませんでした。" + str(e))
     except (DatabaseError, DataError) as e:
         db.rollback()
         logger.error(e.args[0])
+        return
     finally:
         db.close()
 
+    # 更新したデータで静的ページを生成し直す。
+    if Config.STATIC_DIR:
+        try:
+            StaticSite(Config.STATIC_DIR).build()
+        except (DatabaseError, DataError, OSError) as e:
+            logger.error("静的ページを生成できませんでした。" + str(e))
+
 
 if __name__ == "__main__":
-    import_schedules()
+    parser = argparse.ArgumentParser(description="試合スケジュールを取り込む")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="試合スケジュールテーブルを作り直して入れ替える",
+    )
+    args = parser.parse_args()
+    import_schedules(rebuild=args.rebuild)
@@ -0,0 +1,88 @@
+import tempfile
+import time
+import unittest
+
+from afajycal.cache import DownloadCache, PageCache, QueryCache
+
+
+class TestDownloadCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = DownloadCache(self.tmp_dir.name)
+        self.url = "http://dummy.local/nittei.html"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get(self.url))
+        self.cache.save(self.url, b"content", '"abc"', "Mon, 01 Jun 2020 00:00:00 GMT")
+        entry = self.cache.get(self.url)
+        self.assertEqual(entry["content"], b"content")
+        self.assertEqual(entry["etag"], '"abc"')
+        self.assertTrue("fetched_at" in entry)
+
+    def test_get_request_headers(self):
+        self.assertEqual(self.cache.get_request_headers(self.url), {})
+        self.cache.save(self.url, b"content", '"abc"', "Mon, 01 Jun 2020 00:00:00 GMT")
+        expect = {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Mon, 01 Jun 2020 00:00:00 GMT",
+        }
+        self.assertEqual(self.cache.get_request_headers(self.url), expect)
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_get_or_load(self):
+        cache = QueryCache(maxsize=2, ttl=60)
+        self.assertEqual(cache.get_or_load(("find", 1), lambda: "a"), "a")
+        self.assertEqual(cache.get_or_load(("find", 1), lambda: "b"), "a")
+        self.assertEqual(cache.stats, {"hits": 1, "misses": 1, "size": 1})
+
+        # 上限を超えたら最も古く参照された結果から削除する。
+        cache.get_or_load(("find", 2), lambda: "c")
+        cache.get_or_load(("find", 1), lambda: "d")
+        cache.get_or_load(("find", 3), lambda: "e")
+        self.assertEqual(cache.get_or_load(("find", 1), lambda: "f"), "a")
+        self.assertEqual(cache.get_or_load(("find", 2), lambda: "g"), "g")
+
+        cache.clear()
+        self.assertEqual(cache.stats["size"], 0)
+
+    def test_ttl(self):
+        cache = QueryCache(maxsize=2, ttl=0.01)
+        cache.get_or_load("key", lambda: "a")
+        time.sleep(0.02)
+        self.assertEqual(cache.get_or_load("key", lambda: "b"), "b")
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_or_load(self):
+        cache = PageCache(cache_dir=self.tmp_dir.name)
+        key = ("六合", None)
+        self.assertEqual(cache.get_or_load(key, 1, lambda: "page"), "page")
+        self.assertEqual(cache.get_or_load(key, 1, lambda: "other"), "page")
+        self.assertEqual(cache.get_or_load(key, 2, lambda: "new"), "new")
+
+        # 他のワーカーが描画したページをディスクから読み込む。
+        other_cache = PageCache(cache_dir=self.tmp_dir.name)
+        self.assertEqual(other_cache.get_or_load(key, 1, lambda: "other"), "page")
+        self.assertEqual(other_cache.stats["disk_hits"], 1)
+
+    def test_set_version(self):
+        cache = PageCache(cache_dir=self.tmp_dir.name)
+        key = ("六合", None)
+        cache.get_or_load(key, 1, lambda: "page")
+        cache.set_version(2)
+        self.assertEqual(cache.version, 2)
+        self.assertEqual(cache.get_or_load(key, 1, lambda: "other"), "other")
+
+
+if __name__ == "__main__":
+    unittest.main()
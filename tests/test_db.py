@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+
+from afajycal.db import DB, DBPool
+from afajycal.errors import DatabaseError
+
+
+class TestDBPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = DBPool(minconn=1, maxconn=2, health_check_interval=0)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_connect(self):
+        db = self.pool.connect()
+        self.assertTrue(isinstance(db, DB))
+        cursor = db.cursor()
+        cursor.execute("SELECT 1 AS one;")
+        self.assertEqual(cursor.fetchone()["one"], 1)
+        db.close()
+
+        # 返却したコネクションを再利用できることを確認する。
+        db = self.pool.connect()
+        cursor = db.cursor()
+        cursor.execute("SELECT 1 AS one;")
+        self.assertEqual(cursor.fetchone()["one"], 1)
+        db.close()
+
+    def test_closed_connection(self):
+        # 切断されたコネクションは破棄して新しいコネクションを返す。
+        db = self.pool.connect()
+        cursor = db.cursor()
+        cursor.execute("SELECT pg_backend_pid() AS pid;")
+        pid = cursor.fetchone()["pid"]
+        db.rollback()
+        admin = DB()
+        admin_cursor = admin.cursor()
+        admin_cursor.execute("SELECT pg_terminate_backend(%s);", (pid,))
+        admin.close()
+        db.close()
+
+        db = self.pool.connect()
+        cursor = db.cursor()
+        cursor.execute("SELECT 1 AS one;")
+        self.assertEqual(cursor.fetchone()["one"], 1)
+        db.close()
+
+    def test_wait_for_connection(self):
+        # 全てのコネクションが使用中の場合は、例外にせず返却されるまで待つ。
+        pool = DBPool(minconn=1, maxconn=1, health_check_interval=0, timeout=5)
+        try:
+            db = pool.connect()
+            timer = threading.Timer(0.2, db.close)
+            timer.start()
+            start = time.monotonic()
+            other_db = pool.connect()
+            self.assertGreaterEqual(time.monotonic() - start, 0.1)
+            other_db.close()
+            timer.join()
+        finally:
+            pool.close()
+
+    def test_timeout(self):
+        pool = DBPool(minconn=1, maxconn=1, health_check_interval=0, timeout=0.1)
+        try:
+            db = pool.connect()
+            with self.assertRaises(DatabaseError):
+                pool.connect()
+            db.close()
+            # タイムアウトした後も、返却されたコネクションは取得できる。
+            pool.connect().close()
+        finally:
+            pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
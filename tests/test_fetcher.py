@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from requests import Timeout
+
+from afajycal.config import Config
+from afajycal.errors import HTMLDownloadError
+from afajycal.fetcher import Fetcher, Source, load_sources
+from afajycal.scraper import DownloadedExcel, DownloadedHTML
+
+
+class TestSource(unittest.TestCase):
+    def test_kind(self):
+        self.assertEqual(Source("http://dummy.local/nittei.html").kind, "html")
+        self.assertEqual(Source("http://dummy.local/nittei.xlsx").kind, "excel")
+        self.assertEqual(Source("http://dummy.local/", kind="excel").kind, "excel")
+        with self.assertRaises(ValueError):
+            Source("http://dummy.local/", kind="csv")
+
+    def test_load_sources(self):
+        sources = load_sources('[{"url": "http://dummy.local/a.xlsx", "year": 2021}]')
+        self.assertEqual(
+            [(x.url, x.year, x.kind) for x in sources],
+            [("http://dummy.local/a.xlsx", 2021, "excel")],
+        )
+        self.assertEqual(
+            [x.url for x in load_sources(None)],
+            [x["url"] for x in Config.DEFAULT_SOURCES],
+        )
+        # 誤った設定は取り込み処理で分かりやすいエラーにする。
+        for value in ("[{", "{}", "[]", '["http://dummy.local/"]', '[{"uri": "x"}]'):
+            with self.assertRaises(ValueError):
+                load_sources(value)
+
+    def test_scrape(self):
+        source = Source("tests/nittei2020_test.xlsx", year=2021)
+        self.assertEqual(source.year, 2021)
+        downloaded_data = source.download()
+        self.assertIsInstance(downloaded_data, DownloadedExcel)
+        scraped_data = source.scrape(downloaded_data)
+        self.assertEqual(scraped_data.this_year, 2021)
+        self.assertEqual(scraped_data.schedule_data[0]["match_date"].year, 2021)
+
+
+class TestFetcher(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.2)
+        with self.lock:
+            self.running -= 1
+        return Mock(status_code=200, content=url.encode(), headers={})
+
+    @patch("afajycal.fetcher.requests")
+    def test_fetch(self, mock_requests):
+        mock_requests.Session.return_value.get.side_effect = self.get
+        sources = [Source("http://host" + str(i) + ".local/") for i in range(4)]
+        fetcher = Fetcher(max_workers=4, per_host=2, timeout=5)
+        start = time.perf_counter()
+        results = fetcher.fetch(sources)
+        elapsed = time.perf_counter() - start
+        fetcher.close()
+
+        # 並行してダウンロードするため、合計ではなく1件分の時間に近くなる。
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(self.max_running, 4)
+        self.assertTrue(all(isinstance(x, DownloadedHTML) for x in results))
+        self.assertEqual(
+            [x.content for x in results], [x.url.encode() for x in sources]
+        )
+        mock_requests.Session.return_value.get.assert_called_with(
+            "http://host3.local/", headers={}, timeout=5
+        )
+        mock_requests.Session.return_value.close.assert_called_once()
+
+    @patch("afajycal.fetcher.requests")
+    def test_per_host(self, mock_requests):
+        mock_requests.Session.return_value.get.side_effect = self.get
+        sources = [Source("http://dummy.local/" + str(i)) for i in range(4)]
+        Fetcher(max_workers=4, per_host=2).fetch(sources)
+        self.assertEqual(self.max_running, 2)
+
+    @patch("afajycal.fetcher.requests")
+    def test_retry(self, mock_requests):
+        mock_get = mock_requests.Session.return_value.get
+        response = Mock(status_code=200, content=b"", headers={})
+        mock_get.side_effect = [
+            Timeout("Dummy Error."),
+            Mock(status_code=503),
+            response,
+        ]
+        fetcher = Fetcher(retries=2, backoff=0)
+        results = fetcher.fetch([Source("http://dummy.local/")])
+        self.assertEqual(results[0].content, b"")
+        self.assertEqual(mock_get.call_count, 3)
+
+        mock_get.reset_mock()
+        mock_get.side_effect = Timeout("Dummy Error.")
+        fetcher = Fetcher(retries=1, backoff=0)
+        with self.assertRaises(HTMLDownloadError):
+            fetcher.fetch([Source("http://dummy.local/")])
+        self.assertEqual(mock_get.call_count, 2)
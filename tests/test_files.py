@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from afajycal.files import make_build_dir, publish_dir
+
+
+class TestFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.target = os.path.join(self.tmp_dir, "static")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def publish(self, content: str) -> str:
+        build_dir = make_build_dir(self.target)
+        with open(os.path.join(build_dir, "index.html"), "w") as f:
+            f.write(content)
+        publish_dir(build_dir, self.target)
+        return build_dir
+
+    def read(self) -> str:
+        with open(os.path.join(self.target, "index.html")) as f:
+            return f.read()
+
+    def test_publish_dir(self):
+        # 通常のディレクトリが置かれていた場合もシンボリックリンクに置き換える。
+        os.makedirs(self.target)
+        first_dir = self.publish("1")
+        self.assertTrue(os.path.islink(self.target))
+        self.assertEqual(os.stat(first_dir).st_mode & 0o777, 0o755)
+        self.assertEqual(self.read(), "1")
+
+        second_dir = self.publish("2")
+        self.assertEqual(self.read(), "2")
+        self.assertEqual(os.path.realpath(self.target), os.path.realpath(second_dir))
+        # 前回のディレクトリは削除し、作業用の名前も残さない。
+        self.assertEqual(
+            sorted(os.listdir(self.tmp_dir)),
+            sorted(["static", os.path.basename(second_dir)]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
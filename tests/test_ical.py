@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+
+from afajycal.config import Config
+from afajycal.ical import CalendarFeeds, escape_text, fold_line, make_calendar
+from afajycal.models import ScheduleFactory
+
+JST = Config.JST
+test_data = [
+    {
+        "serial_number": 480,
+        "category": "サテライト",
+        "match_number": "ST61",
+        "match_date": date(2019, 6, 2),
+        "kickoff_time": datetime(2019, 6, 2, 14, 0, tzinfo=JST),
+        "home_team": "六合",
+        "away_team": "中富良野",
+        "studium": "花咲球技場",
+    },
+    {
+        "serial_number": 1,
+        "category": "U-15",
+        "match_number": "A1",
+        "match_date": date(2019, 5, 3),
+        "kickoff_time": datetime(2019, 5, 3, 10, 0, tzinfo=JST),
+        "home_team": "六合",
+        "away_team": "永山南",
+        "studium": "東光スポーツ公園",
+    },
+]
+
+
+class TestICal(unittest.TestCase):
+    def setUp(self):
+        factory = ScheduleFactory()
+        for row in test_data:
+            factory.create(**row)
+        self.schedules = factory.items
+        self.tmp_dir = tempfile.mkdtemp()
+        self.feed_dir = os.path.join(self.tmp_dir, "calendar")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_escape_text(self):
+        self.assertEqual(escape_text("a,b;c\\d\ne"), "a\\,b\\;c\\\\d\\ne")
+
+    def test_fold_line(self):
+        line = "SUMMARY:" + "試合" * 40
+        folded = fold_line(line)
+        self.assertEqual(folded.replace("\r\n ", ""), line)
+        for part in folded.split("\r\n"):
+            self.assertLessEqual(len(part.encode("utf-8")), 75)
+
+    def test_make_calendar(self):
+        dtstamp = datetime(2019, 5, 1, tzinfo=timezone.utc)
+        calendar = make_calendar("六合", self.schedules, dtstamp)
+        self.assertTrue(calendar.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertTrue(calendar.endswith("END:VCALENDAR\r\n"))
+        # キックオフ日時の順に並べる。
+        self.assertLess(
+            calendar.index("UID:1@afajycal"), calendar.index("UID:480@afajycal")
+        )
+        self.assertIn("DTSTART:20190602T050000Z\r\n", calendar)
+        self.assertIn("DTEND:20190602T060000Z\r\n", calendar)
+        self.assertIn("DTEND:20190503T023000Z\r\n", calendar)
+
+    def test_build(self):
+        feeds = CalendarFeeds(self.feed_dir)
+        self.assertEqual(feeds.build(self.schedules), 5)
+        path = os.path.join(self.feed_dir, CalendarFeeds.get_filename("team", "六合"))
+        with open(path, encoding="utf-8", newline="") as f:
+            self.assertEqual(f.read().count("BEGIN:VEVENT"), 2)
+
+        # 内容が変わらなければファイルの更新日時も変えない。
+        os.utime(path, (0, 0))
+        feeds.build(self.schedules)
+        self.assertEqual(os.stat(path).st_mtime, 0)
+        feeds.build(self.schedules[:1])
+        self.assertNotEqual(os.stat(path).st_mtime, 0)
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(
+                    self.feed_dir, CalendarFeeds.get_filename("team", "永山南")
+                )
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@ import urllib.parse
 from datetime import date, datetime
 
 from afajycal.config import Config
-from afajycal.models import Schedule, ScheduleFactory
+from afajycal.models import Schedule, ScheduleBatch, ScheduleFactory
 
 JST = Config.JST
 test_data = {
@@ -39,6 +39,11 @@ class TestSchedule(unittest.TestCase):
             self.schedule.kickoff_time, datetime(2019, 6, 2, 14, 0, tzinfo=JST)
         )
 
+    def test_end_time(self):
+        self.assertEqual(
+            self.schedule.end_time, datetime(2019, 6, 2, 15, 0, tzinfo=JST)
+        )
+
     def test_home_team(self):
         self.assertEqual(self.schedule.home_team, "六合")
 
@@ -63,6 +68,24 @@ class TestSchedule(unittest.TestCase):
             + "20190602T060000Z"
         )
         self.assertEqual(self.schedule.google_calendar_link, link_str)
+        self.assertIs(
+            self.schedule.google_calendar_link, self.schedule.google_calendar_link
+        )
+
+    def test_stored_values(self):
+        # データベースに保存した値があれば計算しない。
+        end_time = datetime(2019, 6, 2, 16, 0, tzinfo=JST)
+        schedule = Schedule(**test_data, end_time=end_time, google_calendar_link="")
+        self.assertEqual(schedule.end_time, end_time)
+        self.assertEqual(schedule.google_calendar_link, "")
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.schedule, "__dict__"))
+
+    def test_digest(self):
+        self.assertEqual(self.schedule.digest, Schedule(**test_data).digest)
+        changed_data = dict(test_data, studium="東光スポーツ公園A")
+        self.assertNotEqual(self.schedule.digest, Schedule(**changed_data).digest)
 
 
 class TestScheduleFactory(unittest.TestCase):
@@ -73,5 +96,47 @@ class TestScheduleFactory(unittest.TestCase):
         self.assertTrue(isinstance(schedule, Schedule))
 
 
+class TestScheduleBatch(unittest.TestCase):
+    def setUp(self):
+        other_data = dict(test_data, serial_number=481, home_team="中富良野")
+        self.batch = ScheduleBatch([test_data, other_data])
+
+    def test_getitem(self):
+        self.assertEqual(len(self.batch), 2)
+        self.assertTrue(isinstance(self.batch[0], Schedule))
+        self.assertEqual(self.batch[-1].serial_number, 481)
+        self.assertEqual(self.batch[1].kickoff_time, test_data["kickoff_time"])
+        self.assertEqual([row.home_team for row in self.batch], ["六合", "中富良野"])
+        self.assertEqual(len(self.batch[1:]), 1)
+
+    def test_dictionary_encoding(self):
+        # 同じチーム名、カテゴリ、試合会場は1つだけ保持する。
+        self.assertEqual(self.batch.teams, ["六合", "中富良野"])
+        self.assertEqual(self.batch.categories, ["サテライト"])
+        self.assertEqual(self.batch.studiums, ["花咲球技場"])
+        self.assertEqual(self.batch.column("away_team"), ["中富良野", "中富良野"])
+
+    def test_extend_rows(self):
+        # COLUMNSの順に並べたタプルの行を列ごとに追加する。
+        batch = ScheduleBatch()
+        batch.extend_rows(
+            tuple(row.get(name) for name in ScheduleBatch.COLUMNS)
+            for row in [test_data, dict(test_data, serial_number=481)]
+        )
+        self.assertEqual(batch.column("serial_number"), [480, 481])
+        self.assertEqual(batch.teams, ["六合", "中富良野"])
+        self.assertEqual(batch[1].end_time, self.batch[0].end_time)
+        batch.extend_rows([])
+        self.assertEqual(len(batch), 2)
+
+    def test_eq(self):
+        self.assertEqual(ScheduleBatch(), ScheduleBatch())
+        # Scheduleオブジェクトは同じ値でも別のオブジェクトのため、リストとは比較しない。
+        self.assertNotEqual(self.batch, list(self.batch))
+        other_data = dict(test_data, serial_number=481, home_team="中富良野")
+        self.assertEqual(self.batch, ScheduleBatch([test_data, other_data]))
+        self.assertNotEqual(self.batch, ScheduleBatch([test_data, test_data]))
+
+
 if __name__ == "__main__":
     unittest.main()
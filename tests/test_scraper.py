@@ -1,13 +1,18 @@
+import importlib.util
+import tempfile
 import unittest
 from datetime import date, datetime, timedelta, timezone
 from unittest.mock import Mock, patch
 
 from requests import HTTPError, Timeout
 
+from afajycal.cache import DownloadCache
 from afajycal.errors import HTMLDownloadError
 from afajycal.scraper import (
     DownloadedExcel,
     DownloadedHTML,
+    HTMLTableParser,
+    ScrapedData,
     ScrapedExcelData,
     ScrapedHTMLData,
 )
@@ -157,6 +162,26 @@ class TestDownloadedHTML(unittest.TestCase):
         with self.assertRaises(HTMLDownloadError):
             DownloadedHTML("http://dummy.local")
 
+    @patch("afajycal.scraper.requests")
+    def test_conditional_request(self, mock_requests):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = DownloadCache(tmp_dir)
+            mock_requests.get.return_value = Mock(
+                status_code=200,
+                content=self.html_content,
+                headers={"ETag": '"abc"'},
+            )
+            schedule_html = DownloadedHTML("http://dummy.local", cache=cache)
+            self.assertEqual(schedule_html.content, self.html_content)
+
+            # 更新されていなければキャッシュの内容を返す。
+            mock_requests.get.return_value = Mock(status_code=304, headers={})
+            schedule_html = DownloadedHTML("http://dummy.local", cache=cache)
+            self.assertEqual(schedule_html.content, self.html_content.encode())
+            mock_requests.get.assert_called_with(
+                "http://dummy.local", headers={"If-None-Match": '"abc"'}
+            )
+
 
 class TestDownloadedExcel(unittest.TestCase):
     def test_lists(self):
@@ -166,6 +191,23 @@ class TestDownloadedExcel(unittest.TestCase):
         self.assertEqual(result[0], expect[0])
         self.assertEqual(result[1], expect[1])
 
+    def test_normalize_cell(self):
+        self.assertEqual(DownloadedExcel._normalize_cell(None), "")
+        self.assertEqual(DownloadedExcel._normalize_cell(3.0), "3")
+        self.assertEqual(DownloadedExcel._normalize_cell(3.5), "3.5")
+        self.assertEqual(DownloadedExcel._normalize_cell("六　合"), "六　合")
+
+
+class TestScrapedData(unittest.TestCase):
+    def test_abstract(self):
+        class IncompleteScrapedData(ScrapedData):
+            def _get_rows(self):
+                return list()
+
+        # 抽出処理を実装していない派生クラスは、取り込みの途中ではなく生成時に失敗する。
+        with self.assertRaises(TypeError):
+            IncompleteScrapedData()
+
 
 class TestScrapedHTMLData(unittest.TestCase):
     def setUp(self):
@@ -204,6 +246,18 @@ class TestScrapedHTMLData(unittest.TestCase):
             },
         ]
         self.assertEqual(scraper.schedule_data, expect)
+        self.assertEqual(
+            list(ScrapedHTMLData(downloaded_html).iter_schedule_data()), expect
+        )
+
+        # 各行は1回だけ変換する。
+        scraper = ScrapedHTMLData(downloaded_html)
+        with patch.object(
+            scraper, "_extract_schedule_data", wraps=scraper._extract_schedule_data
+        ) as mock_extract:
+            self.assertEqual(len(scraper.schedule_data), 2)
+            rows = list(scraper._get_table_values(downloaded_html))
+            self.assertEqual(mock_extract.call_count, len(rows))
 
         # 想定外のテーブル要素があった場合は空リストを返す。
         dummy_table = """
@@ -220,6 +274,48 @@ class TestScrapedHTMLData(unittest.TestCase):
         scraper = ScrapedHTMLData(downloaded_html)
         self.assertEqual(scraper.schedule_data, [])
 
+    @patch("afajycal.scraper.requests")
+    def test_encoding(self, mock_requests):
+        # meta要素で宣言された文字コードで変換する。
+        content = self.html_content.replace(
+            "<table", '<meta charset="Shift_JIS"><table', 1
+        ).encode("cp932")
+        mock_requests.get.return_value = Mock(status_code=200, content=content)
+        scraper = ScrapedHTMLData(DownloadedHTML("http://dummy.local"))
+        self.assertEqual(scraper.schedule_data[0]["home_team"], "六合")
+
+        # 宣言がなければUTF-8、CP932、EUC-JPの順に試す。
+        for encoding in ("utf-8", "cp932", "euc_jp"):
+            content = self.html_content.encode(encoding)
+            mock_requests.get.return_value = Mock(status_code=200, content=content)
+            scraper = ScrapedHTMLData(DownloadedHTML("http://dummy.local"))
+            self.assertEqual(scraper.schedule_data[1]["away_team"], "六合")
+
+
+class TestHTMLTableParser(unittest.TestCase):
+    def parse(self, html):
+        parser = HTMLTableParser()
+        parser.feed(html)
+        parser.close()
+        return parser.pop_rows()
+
+    def test_string(self):
+        # BeautifulSoupのTag.stringと同じく、子要素が1つの場合だけ文字列を返す。
+        rows = self.parse(
+            '<table border="1"><tr><td>a&amp;b</td><td><b><i>c</i></b></td>'
+            + "<td> <b>d</b></td><td><br></td><td><!--e--></td><td>f</b>g</td>"
+            + "</tr></table>"
+        )
+        self.assertEqual(rows, [["a&b", "c", None, None, "e", None]])
+
+    def test_nesting(self):
+        # 閉じられていないtd要素・tr要素は入れ子として扱う。
+        rows = self.parse(
+            '<table border="2"><tr><td>x</td></tr></table>'
+            + '<table border="1"><tr><td>1<td>2</tr><tr><td>3</td><tr><td>4'
+        )
+        self.assertEqual(rows, [[None, "2"], ["3", "4"], ["4"]])
+
 
 class TestScrapedExcelData(unittest.TestCase):
     def setUp(self):
@@ -243,3 +339,49 @@ class TestScrapedExcelData(unittest.TestCase):
             }
         ]
         self.assertEqual(scraper.schedule_data, expect)
+
+    @unittest.skipUnless(importlib.util.find_spec("pandas"), "pandas is not installed")
+    def test_vectorized(self):
+        expect = ScrapedExcelData(self.downloaded_excel, vectorized=False)
+        scraper = ScrapedExcelData(self.downloaded_excel, vectorized=True)
+        self.assertEqual(scraper.schedule_data, expect.schedule_data)
+
+    @unittest.skipUnless(importlib.util.find_spec("pandas"), "pandas is not installed")
+    def test_vectorized_rules(self):
+        def row(month, day, kickoff_time):
+            return [
+                "M1",
+                "AC1",
+                "1",
+                month,
+                day,
+                "D1",
+                "B",
+                "会場",
+                kickoff_time,
+                "六　合",
+                "vs",
+                "留　萌",
+                "1",
+            ]
+
+        rows = [
+            row("4", "5", "10:00"),
+            row("13", "x", "10:00"),
+            row("2", "3", "10:30:00"),
+            row("4", "5", "25:00"),
+            row("4", "5", "9:5"),
+            row("4", "", "10:00"),
+        ]
+        downloaded_excel = Mock()
+        downloaded_excel.iter_rows.side_effect = lambda: iter(rows)
+        expect = ScrapedExcelData(downloaded_excel, vectorized=False)
+        scraper = ScrapedExcelData(downloaded_excel, vectorized=True, chunk_size=4)
+        self.assertEqual(len(expect.schedule_data), 5)
+        self.assertEqual(scraper.schedule_data, expect.schedule_data)
+
+        rows = [row("4", "5", "24:00")]
+        with self.assertRaises(ValueError):
+            list(
+                ScrapedExcelData(downloaded_excel, vectorized=True).iter_schedule_data()
+            )
@@ -1,10 +1,12 @@
+import time
 import unittest
 from datetime import date, datetime
 
+from afajycal.cache import QueryCache
 from afajycal.config import Config
 from afajycal.db import DB
-from afajycal.models import ScheduleFactory
-from afajycal.services import ScheduleService
+from afajycal.models import Schedule, ScheduleFactory
+from afajycal.services import ScheduleChangeListener, ScheduleService
 
 JST = Config.JST
 test_data = [
@@ -48,8 +50,23 @@ class TestScheduleService(unittest.TestCase):
         self.service.truncate()
         for item in self.factory.items:
             self.assertTrue(self.service.create(item))
+        self.service.refresh_teams()
         self.db.commit()
 
+    def test_create_many(self):
+        self.assertEqual(self.service.create_many(self.factory.items, page_size=1), 2)
+        self.assertEqual(self.service.create_many([]), 0)
+        self.db.commit()
+        self.assertEqual(len(self.service.find()), 2)
+
+    def test_create_unchanged(self):
+        # 内容が変わっていなければ更新日時を書き換えない。
+        last_updated = self.service.get_last_updated()
+        for item in self.factory.items:
+            self.assertTrue(self.service.create(item))
+        self.db.commit()
+        self.assertEqual(self.service.get_last_updated(), last_updated)
+
     def test_find(self):
         found_schedules = self.service.find(team_name="旭川市立六合中学校", category="サテライト")
         result = found_schedules[0]
@@ -58,8 +75,42 @@ class TestScheduleService(unittest.TestCase):
         self.assertEqual(result.studium, "花咲球技場")
         self.assertEqual(result.match_date, date(2019, 6, 2))
         self.assertEqual(result.kickoff_time, datetime(2019, 6, 2, 14, 0, tzinfo=JST))
+        self.assertEqual(result.end_time, datetime(2019, 6, 2, 15, 0, tzinfo=JST))
+        self.assertEqual(
+            result.google_calendar_link, self.factory.items[0].google_calendar_link
+        )
         found_schedules = self.service.find(match_date=date(2019, 9, 18))
-        self.assertEqual(found_schedules, [])
+        self.assertEqual(len(found_schedules), 0)
+
+    def test_find_team_name(self):
+        # 一覧にあるチーム名でも、そのチーム名を含むチームを全て検索する。
+        condition, values = self.service._get_search_condition(team_name="中富良野")
+        self.assertIn("home_team_normalized LIKE %s", condition)
+        self.assertEqual(values[:2], ("%中富良野%", "%中富良野%"))
+        found_schedules = self.service.find(team_name="富良野")
+        self.assertEqual(found_schedules[0].away_team, "中富良野")
+        self.assertEqual(len(self.service.find(team_name="東光")), 0)
+        # 3文字未満の入力は整形済みのチーム名の一覧から一致するチームを探す。
+        condition, values = self.service._get_search_condition(team_name="永山")
+        self.assertIn("home_team_normalized = ANY(ARRAY(SELECT", condition)
+        self.assertEqual(values[:2], ("%永山%", "%永山%"))
+        self.assertEqual(self.service.find(team_name="永山")[0].home_team, "永山南")
+        self.assertEqual(len(self.service.find(team_name="六合")), 2)
+        self.assertEqual(len(self.service.find(team_name="合")), 2)
+
+    def test_stored_calendar_link(self):
+        # 取り込み時に作成したリンクと終了時刻をデータベースに保存する。
+        cursor = self.db.cursor()
+        cursor.execute(
+            "SELECT end_time,google_calendar_link FROM schedules"
+            + " "
+            + "WHERE serial_number = '469';"
+        )
+        row = cursor.fetchone()
+        self.assertEqual(row["end_time"], datetime(2019, 6, 8, 15, 30, tzinfo=JST))
+        self.assertEqual(
+            row["google_calendar_link"], self.factory.items[1].google_calendar_link
+        )
 
     def test_get_all_teams(self):
         expect = ["六合", "永山南", "中富良野"]
@@ -69,6 +120,150 @@ class TestScheduleService(unittest.TestCase):
         expect = ["サテライト", "地区カブス"]
         self.assertEqual(self.service.get_all_categories(), expect)
 
+    def test_get_data_version(self):
+        version = self.service.get_data_version()
+        self.assertEqual(self.service.bump_version(), version + 1)
+        self.db.commit()
+        self.assertEqual(self.service.get_data_version(), version + 1)
+
+    def test_get_version_updated_at(self):
+        # 試合を削除しただけの更新でも、バージョンを更新した日時は変わる。
+        updated_at = self.service.get_version_updated_at()
+        time.sleep(0.01)
+        self.service.sync(self.factory.items[:1])
+        self.db.commit()
+        self.assertGreater(self.service.get_version_updated_at(), updated_at)
+
+        # バージョンが変わるまではキャッシュした日時を返す。
+        cache = QueryCache()
+        service = ScheduleService(self.db, cache=cache)
+        updated_at = service.get_version_updated_at()
+        self.assertEqual(service.get_version_updated_at(), updated_at)
+        self.assertEqual(cache.stats["hits"], 1)
+
+    def test_cached_query(self):
+        cache = QueryCache()
+        service = ScheduleService(self.db, cache=cache)
+        expect = service.get_all_categories()
+        self.assertEqual(service.get_all_categories(), expect)
+        self.assertEqual(cache.stats["hits"], 1)
+        # バージョンが変われば新しく取得する。
+        self.service.bump_version()
+        self.db.commit()
+        service = ScheduleService(self.db, cache=cache)
+        self.assertEqual(service.get_all_categories(), expect)
+        self.assertEqual(cache.stats["misses"], 2)
+
+    def test_change_listener(self):
+        cache = QueryCache()
+        listener = ScheduleChangeListener([cache], timeout=0.1)
+        listener.start()
+        version = self.service.get_data_version()
+        self.assertTrue(self._wait_for(lambda: cache.version == version))
+        cache.get_or_load("key", lambda: "value")
+        # 取り込み処理がコミットすると通知が届き、キャッシュが破棄される。
+        self.service.bump_version()
+        self.db.commit()
+        self.assertTrue(self._wait_for(lambda: cache.version == version + 1))
+        self.assertEqual(cache.stats["size"], 0)
+
+    @staticmethod
+    def _wait_for(condition, timeout=5):
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            if condition():
+                return True
+            time.sleep(0.05)
+        return False
+
+    def test_get_page_data(self):
+        page_data = self.service.get_page_data(
+            team_name="旭川市立六合中学校", category="サテライト"
+        )
+        self.assertEqual(len(page_data["schedules"]), 1)
+        self.assertEqual(page_data["schedules"][0].away_team, "中富良野")
+        self.assertEqual(page_data["teams"], self.service.get_all_teams())
+        self.assertEqual(page_data["categories"], self.service.get_all_categories())
+        self.assertEqual(page_data["last_updated"], self.service.get_last_updated())
+        # 検索結果がなくてもチーム名などは返す。
+        page_data = self.service.get_page_data(match_date=date(2019, 9, 18))
+        self.assertEqual(len(page_data["schedules"]), 0)
+        self.assertEqual(page_data["teams"], self.service.get_all_teams())
+
+    def test_get_source_digest(self):
+        url = "http://dummy.local"
+        self.service.save_source_digest(url, "abc")
+        self.db.commit()
+        self.assertEqual(self.service.get_source_digest(url), "abc")
+        self.assertIsNone(self.service.get_source_digest("http://unknown.local"))
+        self.assertEqual(self.service.get_source_digests()[url], "abc")
+        # 取り込まなくなった取得元のハッシュ値を削除する。
+        self.service.delete_source_digests([url])
+        self.service.delete_source_digests([])
+        self.db.commit()
+        self.assertNotIn(url, self.service.get_source_digests())
+
+    def test_rebuild(self):
+        self.assertEqual(self.service.rebuild(self.factory.items), 2)
+        self.db.commit()
+        self.assertEqual(len(self.service.find()), 2)
+        # 入れ替え後のテーブルにも一意制約があることを確認する。
+        self.assertEqual(self.service.create_many(self.factory.items), 2)
+        self.db.commit()
+        self.assertEqual(len(self.service.find()), 2)
+
+        # 1件ずつ登録しても、重複する連番は後に出てきたデータを優先する。
+        changed = Schedule(**dict(test_data[0], studium="東光スポーツ公園A"))
+        schedules = iter(self.factory.items + [changed])
+        self.assertEqual(self.service.rebuild(schedules, batch_size=1), 2)
+        self.assertEqual(
+            self.service.find(category="サテライト")[0].studium, "東光スポーツ公園A"
+        )
+        self.assertEqual(self.service.rebuild(self.factory.items), 2)
+        self.db.commit()
+
+    def test_sync(self):
+        changed = Schedule(**dict(test_data[0], studium="東光スポーツ公園A"))
+        added = Schedule(**dict(test_data[0], serial_number=481))
+        summary = self.service.sync([changed, added])
+        self.db.commit()
+        expect = {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 0}
+        self.assertEqual(summary, expect)
+        found_schedules = self.service.find()
+        self.assertEqual(len(found_schedules), 2)
+
+        # 元の状態に戻す。
+        summary = self.service.sync(self.factory.items)
+        self.db.commit()
+        expect = {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 0}
+        self.assertEqual(summary, expect)
+        summary = self.service.sync(self.factory.items)
+        self.db.commit()
+        expect = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2}
+        self.assertEqual(summary, expect)
+
+    def test_sync_batches(self):
+        # ジェネレータから1件ずつ登録し、含まれなかった試合スケジュールを削除する。
+        added = Schedule(**dict(test_data[0], serial_number=481))
+        schedules = (item for item in [added] + self.factory.items[:1])
+        summary = self.service.sync(schedules, batch_size=1)
+        self.db.commit()
+        expect = {"inserted": 1, "updated": 0, "deleted": 1, "unchanged": 1}
+        self.assertEqual(summary, expect)
+        self.assertEqual(len(self.service.find()), 2)
+
+        # 元の状態に戻す。
+        summary = self.service.sync(iter(self.factory.items), batch_size=1)
+        self.db.commit()
+        expect = {"inserted": 1, "updated": 0, "deleted": 1, "unchanged": 1}
+        self.assertEqual(summary, expect)
+
+    def test_trim_team_name(self):
+        self.assertEqual(ScheduleService._trim_team_name("旭川市立六合中学校"), "六合")
+        self.assertEqual(ScheduleService._trim_team_name(" 六合中 "), "六合")
+        # 末尾以外の「中」は削除しない。
+        self.assertEqual(ScheduleService._trim_team_name("中富良野中"), "中富良野")
+
 
 if __name__ == "__main__":
     unittest.main()
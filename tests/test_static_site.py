@@ -0,0 +1,90 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from afajycal.config import Config
+from afajycal.db import DB
+from afajycal.models import ScheduleFactory
+from afajycal.services import ScheduleService
+from afajycal.static_site import StaticSite
+
+JST = Config.JST
+test_data = [
+    {
+        "serial_number": 480,
+        "category": "サテライト",
+        "match_number": "ST61",
+        "match_date": date(2019, 6, 2),
+        "kickoff_time": datetime(2019, 6, 2, 14, 0, tzinfo=JST),
+        "home_team": "六合",
+        "away_team": "中富良野",
+        "studium": "花咲球技場",
+    },
+]
+
+
+class TestStaticSite(unittest.TestCase):
+    def setUp(self):
+        factory = ScheduleFactory()
+        for row in test_data:
+            factory.create(**row)
+        db = DB()
+        ScheduleService(db).sync(factory.items)
+        db.commit()
+        db.close()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.tmp_dir, "static")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_build(self):
+        static_site = StaticSite(self.output_dir)
+        self.assertEqual(static_site.build(), 6)
+        path = os.path.join(self.output_dir, "find", "team", "%E5%85%AD%E5%90%88.html")
+        with open(path, encoding="utf-8") as f:
+            page = f.read()
+        self.assertIn("花咲球技場", page)
+        with gzip.open(path + ".gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), page)
+        for name in ("index.html", "404.html", "find/index.html"):
+            self.assertTrue(os.path.exists(os.path.join(self.output_dir, name)))
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    self.output_dir,
+                    "find",
+                    "category",
+                    "%E3%82%B5%E3%83%86%E3%83%A9%E3%82%A4%E3%83%88.html",
+                )
+            )
+        )
+
+        # 生成し直した場合は古いファイルを残さない。
+        open(os.path.join(self.output_dir, "stale.html"), "w").close()
+        static_site.build()
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "stale.html")))
+        # 公開中のディレクトリへのリンクと、そのディレクトリだけが残る。
+        self.assertTrue(os.path.islink(self.output_dir))
+        self.assertEqual(len(os.listdir(self.tmp_dir)), 2)
+
+    @patch("afajycal.views.db_pool")
+    def test_build_with_db(self, mock_db_pool):
+        # Webアプリケーションのコネクションプールは使わない。
+        db = DB()
+        try:
+            self.assertEqual(StaticSite(self.output_dir, db=db).build(), 6)
+            # 渡されたDBオブジェクトは閉じない。
+            self.assertEqual(ScheduleService(db).get_all_categories(), ["サテライト"])
+        finally:
+            db.close()
+        StaticSite(self.output_dir).build()
+        mock_db_pool.connect.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
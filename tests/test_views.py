@@ -0,0 +1,177 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from afajycal.config import Config
+from afajycal.db import DB
+from afajycal.ical import CalendarFeeds
+from afajycal.models import ScheduleFactory
+from afajycal.services import ScheduleService
+from afajycal.views import app, page_cache, query_cache
+
+JST = Config.JST
+test_data = [
+    {
+        "serial_number": 480,
+        "category": "サテライト",
+        "match_number": "ST61",
+        "match_date": date(2019, 6, 2),
+        "kickoff_time": datetime(2019, 6, 2, 14, 0, tzinfo=JST),
+        "home_team": "六合",
+        "away_team": "中富良野",
+        "studium": "花咲球技場",
+    },
+    {
+        "serial_number": 481,
+        "category": "サテライト",
+        "match_number": "ST62",
+        "match_date": date(2019, 6, 2),
+        "kickoff_time": datetime(2019, 6, 2, 14, 0, tzinfo=JST),
+        "home_team": "東光",
+        "away_team": "永山南",
+        "studium": "花咲球技場",
+    },
+]
+
+
+class TestViews(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        factory = ScheduleFactory()
+        for row in test_data:
+            factory.create(**row)
+        db = DB()
+        ScheduleService(db).sync(factory.items)
+        db.commit()
+        db.close()
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+
+    def test_conditional_find(self):
+        url = "/find?team_name=六合&category="
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+
+        # ETagが一致すればテンプレートを描画せずに304を返す。
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        # 検索条件が違えばETagも異なる。
+        response = self.client.get(
+            "/find?team_name=永山南&category=", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_warm_find_without_query(self):
+        # 更新通知でバージョンが分かっていれば、キャッシュ済みのページと304の応答では
+        # データベースに問い合わせない。
+        db = DB()
+        try:
+            query_cache.set_version(ScheduleService(db).get_data_version())
+        finally:
+            db.close()
+        url = "/find?team_name=永山南&category="
+        etag = self.client.get(url).headers["ETag"]
+        with patch.object(ScheduleService, "_execute") as mock_execute:
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+        mock_execute.assert_not_called()
+
+    def test_page_cache(self):
+        url = "/find?team_name=中富良野&category="
+        response = self.client.get(url)
+        hits = page_cache.stats["hits"]
+        cached_response = self.client.get(url)
+        self.assertEqual(page_cache.stats["hits"], hits + 1)
+        self.assertEqual(cached_response.data, response.data)
+
+    def test_conditional_index(self):
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            "/",
+            headers={"If-Modified-Since": response.headers["Last-Modified"]},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_api_schedules(self):
+        response = self.client.get("/api/schedules?category=サテライト&limit=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/json")
+        data = response.get_json()
+        self.assertEqual(len(data["schedules"]), 1)
+        self.assertEqual(data["schedules"][0]["serial_number"], "480")
+        self.assertEqual(
+            data["schedules"][0]["kickoff_time"], "2019-06-02T14:00:00+09:00"
+        )
+
+        # キックオフ日時が同じ試合も連番の順に次のページで返す。
+        data = self.client.get(data["next"]).get_json()
+        self.assertEqual(
+            [schedule["serial_number"] for schedule in data["schedules"]], ["481"]
+        )
+        data = self.client.get(data["next"]).get_json()
+        self.assertEqual(data, {"schedules": [], "next": None})
+
+        response = self.client.get(
+            "/api/schedules?team_name=永山南&date_from=2019-06-02&date_to=2019-06-02"
+        )
+        data = response.get_json()
+        self.assertEqual(data["schedules"][0]["home_team"], "東光")
+        self.assertIsNone(data["next"])
+        response = self.client.get(
+            "/api/schedules?date_to=2019-06-01",
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+        self.assertEqual(response.get_json()["schedules"], [])
+
+    def test_api_schedules_bad_request(self):
+        for query in ("date_from=2019/06/02", "limit=0", "after=480"):
+            response = self.client.get("/api/schedules?" + query)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.get_json())
+
+    def test_calendar(self):
+        factory = ScheduleFactory()
+        for row in test_data:
+            factory.create(**row)
+        tmp_dir = tempfile.mkdtemp()
+        calendar_dir = os.path.join(tmp_dir, "calendar")
+        original_calendar_dir = Config.CALENDAR_DIR
+        Config.CALENDAR_DIR = calendar_dir
+        try:
+            CalendarFeeds(calendar_dir).build(factory.items)
+            response = self.client.get("/calendar/六合.ics")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, "text/calendar")
+            self.assertIn(b"UID:480@afajycal", response.data)
+            response = self.client.get(
+                "/calendar/六合.ics",
+                headers={"If-None-Match": response.headers["ETag"]},
+            )
+            self.assertEqual(response.status_code, 304)
+            response = self.client.get("/calendar/category/サテライト.ics")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b"UID:481@afajycal", response.data)
+            # 生成されていないカレンダーはデータベースに問い合わせずに404を返す。
+            with patch("afajycal.views.db_pool") as mock_db_pool:
+                response = self.client.get("/calendar/category/U-15.ics")
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.mimetype, "text/plain")
+                Config.CALENDAR_DIR = None
+                response = self.client.get("/calendar/六合.ics")
+                self.assertEqual(response.status_code, 404)
+            mock_db_pool.connect.assert_not_called()
+        finally:
+            Config.CALENDAR_DIR = original_calendar_dir
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()